@@ -6,18 +6,67 @@ DHT11センサーから温湿度データを収集し、JSONファイルに保
 GitHub Pages用リポジトリに自動プッシュします。
 """
 
+import bisect
 import json
+import logging
+import logging.handlers
 import os
+import shutil
+import signal
 import sys
 import time
 import subprocess
 import configparser
+import textwrap
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 # DHT11ライブラリをインポート
 from dht11_library import DHT11
 
+# _log() のレベル名 → loggingのレベル値（呼び出し毎のgetattrを避ける）
+_LOG_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+}
+
+# データファイル書き出し用のエンコーダ（iterencodeで少しずつ書き出す）
+_JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+
+@dataclass(slots=True, frozen=True)
+class Config:
+    """型変換済みの設定値（config.iniの各セクションを平坦化したもの）"""
+    sensor_pin: int
+    retry_count: int
+    read_interval: int
+    data_file: Path
+    max_records: int
+    backup_enabled: bool
+    cleanup_days: int | None
+    repo_path: Path
+    auto_push: bool
+    commit_message: str
+    push_batch_size: int
+    remote_name: str
+    branch_name: str
+    log_level: str
+    console_output: bool
+    log_file: str | None
+
 
 class TemperatureHumidityLogger:
     """温湿度データロガークラス"""
@@ -30,15 +79,24 @@ class TemperatureHumidityLogger:
             config_file (str): 設定ファイルのパス
         """
         self.config = self._load_config(config_file)
-        self.sensor = DHT11(pin=self.config['sensor']['pin'])
-        self.data_file = Path(self.config['data']['file_path'])
-        self.repo_path = Path(self.config['git']['repo_path'])
+        self.logger = self._setup_logger()
+        self.sensor = DHT11(pin=self.config.sensor_pin)
+        self.data_file = self.config.data_file
+        self.repo_path = self.config.repo_path
+        
+        self._unpushed_commits = 0
+        
+        # pygit2が使える場合はリポジトリを開いたままにし、コミットまでをプロセス内で行う
+        self._repo = self._open_repository()
         
         # データディレクトリを作成
         self.data_file.parent.mkdir(parents=True, exist_ok=True)
         
+        # 保存済みデータは起動時に一度だけ読み込み、以降はメモリ上で保持
+        self._data_cache = self.load_existing_data()
+        
         print(f"温湿度ロガーを初期化しました")
-        print(f"センサーピン: GPIO{self.config['sensor']['pin']}")
+        print(f"センサーピン: GPIO{self.config.sensor_pin}")
         print(f"データファイル: {self.data_file}")
         print(f"リポジトリパス: {self.repo_path}")
     
@@ -62,6 +120,7 @@ class TemperatureHumidityLogger:
                 'repo_path': '/home/pi/temperature_humidity_monitor',
                 'auto_push': 'true',
                 'commit_message': 'Update sensor data',
+                'push_batch_size': '15',
                 'remote_name': 'origin',
                 'branch_name': 'main'
             },
@@ -77,23 +136,76 @@ class TemperatureHumidityLogger:
             print(f"設定ファイルが見つかりません。デフォルト設定で {config_file} を作成します。")
             self._create_default_config(config_file, default_config)
         
+        # 設定ファイルに無い項目はデフォルト値を使用
+        config.read_dict(default_config)
         config.read(config_file)
         
-        # 型変換
-        parsed_config = {}
-        for section_name, section in config.items():
-            if section_name == 'DEFAULT':
-                continue
-            parsed_config[section_name] = {}
-            for key, value in section.items():
-                if key in ['pin', 'retry_count', 'read_interval', 'max_records']:
-                    parsed_config[section_name][key] = int(value)
-                elif key in ['backup_enabled', 'auto_push', 'console_output']:
-                    parsed_config[section_name][key] = value.lower() == 'true'
-                else:
-                    parsed_config[section_name][key] = value
+        # 型変換（起動時に一度だけ行う）
+        sensor = config['sensor']
+        data = config['data']
+        git = config['git']
+        logging_section = config['logging']
+        
+        return Config(
+            sensor_pin=sensor.getint('pin'),
+            retry_count=sensor.getint('retry_count'),
+            read_interval=sensor.getint('read_interval'),
+            data_file=Path(data['file_path']),
+            max_records=data.getint('max_records'),
+            backup_enabled=data.getboolean('backup_enabled'),
+            cleanup_days=data.getint('cleanup_days', fallback=None),
+            repo_path=Path(git['repo_path']),
+            auto_push=git.getboolean('auto_push'),
+            commit_message=git['commit_message'],
+            push_batch_size=git.getint('push_batch_size'),
+            remote_name=git['remote_name'],
+            branch_name=git['branch_name'],
+            log_level=logging_section['level'],
+            console_output=logging_section.getboolean('console_output'),
+            log_file=logging_section.get('log_file') or None
+        )
+    
+    def _setup_logger(self):
+        """
+        ロガーを設定
         
-        return parsed_config
+        ログファイルは開いたまま保持し、書き込みは10件ごとにまとめて行います
+        （WARNING以上は即座に書き込み）。ファイルが外部でリネーム・削除された
+        場合はWatchedFileHandlerが開き直します。
+        """
+        logger = logging.getLogger('temp_humidity')
+        logger.setLevel(getattr(logging, self.config.log_level.upper(), logging.INFO))
+        logger.propagate = False
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            target = getattr(handler, 'target', None)
+            handler.close()  # MemoryHandlerはここで溜めたログを書き出す
+            if target is not None:
+                target.close()
+        
+        formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s',
+                                      datefmt='%Y-%m-%d %H:%M:%S')
+        
+        if self.config.console_output:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(formatter)
+            logger.addHandler(console_handler)
+        
+        # ログファイルへの出力（オプション）
+        if self.config.log_file:
+            try:
+                file_handler = logging.handlers.WatchedFileHandler(
+                    self.config.log_file, encoding='utf-8'
+                )
+            except OSError:
+                pass  # ログファイルが開けない場合は無視
+            else:
+                file_handler.setFormatter(formatter)
+                logger.addHandler(logging.handlers.MemoryHandler(
+                    capacity=10, flushLevel=logging.WARNING, target=file_handler
+                ))
+        
+        return logger
     
     def _create_default_config(self, config_file, default_config):
         """デフォルト設定ファイルを作成"""
@@ -112,7 +224,7 @@ class TemperatureHumidityLogger:
             dict: センサーデータ辞書、エラー時はNone
         """
         temperature, humidity, status = self.sensor.read_retry(
-            retries=self.config['sensor']['retry_count']
+            retries=self.config.retry_count
         )
         
         if status == 'OK':
@@ -141,68 +253,216 @@ class TemperatureHumidityLogger:
     
     def save_data(self, data_list):
         """
-        データをJSONファイルに保存
+        データをJSONファイルに保存（ファイル全体を書き直し）
         
         Args:
             data_list (list): センサーデータのリスト
         """
         # データ件数制限
-        max_records = self.config['data']['max_records']
+        max_records = self.config.max_records
         if len(data_list) > max_records:
             data_list = data_list[-max_records:]
         
-        # バックアップ作成
-        if self.config['data']['backup_enabled'] and self.data_file.exists():
-            backup_file = self.data_file.with_suffix('.json.bak')
-            try:
-                subprocess.run(['cp', str(self.data_file), str(backup_file)], check=True)
-            except subprocess.CalledProcessError as e:
-                self._log(f"バックアップ作成エラー: {e}", level='WARNING')
+        # 置き換え前のファイルをハードリンクで残す（コピー不要）
+        self._backup_data_file()
         
-        # データ保存
+        # データ保存（一時ファイルに書き出してから置き換え）
+        tmp_file = self.data_file.with_suffix('.json.tmp')
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data_list, f, indent=2, ensure_ascii=False)
+            if orjson is not None:
+                # orjsonは json.dump(indent=2, ensure_ascii=False) と同じ形式のbytesを返す
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(data_list, option=orjson.OPT_INDENT_2))
+            else:
+                # 文字列全体を組み立てず、エンコード結果を順にファイルへ流す
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.writelines(_JSON_ENCODER.iterencode(data_list))
+            os.replace(tmp_file, self.data_file)
             self._log(f"データを保存しました: {len(data_list)}件")
         except IOError as e:
             self._log(f"データ保存エラー: {e}", level='ERROR')
             raise
     
-    def git_push(self):
-        """GitHubにデータをプッシュ"""
-        if not self.config['git']['auto_push']:
+    def append_record(self, record):
+        """
+        既存のJSON配列の末尾にレコードを追記
+        
+        ファイル全体は書き直さず、末尾の ']' 以降だけを上書きします。
+        出力形式は json.dump(indent=2) と同一です。書き込みに失敗した場合は
+        元の末尾に戻すため、追記前のバックアップは作成しません。
+        
+        Args:
+            record (dict): 追記するセンサーデータ
+            
+        Returns:
+            bool: 追記できた場合True（ファイルが無い・形式が想定外の場合False）
+        """
+        if not self.data_file.exists():
+            return False
+        
+        entry = textwrap.indent(json.dumps(record, indent=2, ensure_ascii=False), '  ')
+        
+        try:
+            with open(self.data_file, 'r+b') as f:
+                size = f.seek(0, os.SEEK_END)
+                tail_start = max(0, size - 64)
+                f.seek(tail_start)
+                original_tail = f.read()
+                tail = original_tail.rstrip()
+                
+                # 末尾が ']' で、その直前が '['（空配列）または '}' であること
+                if not tail.endswith(b']'):
+                    return False
+                body = tail[:-1].rstrip()
+                if body.endswith(b'['):
+                    separator = '\n'
+                elif body.endswith(b'}'):
+                    separator = ',\n'
+                else:
+                    return False
+                
+                f.seek(tail_start + len(body))
+                try:
+                    f.write((separator + entry + '\n]').encode('utf-8'))
+                    f.truncate()
+                    f.flush()
+                except OSError:
+                    # 追記前の末尾に戻してから呼び出し元に失敗を伝える
+                    f.seek(tail_start)
+                    f.write(original_tail)
+                    f.truncate(size)
+                    raise
+            return True
+        except IOError as e:
+            self._log(f"データ追記エラー: {e}", level='WARNING')
+            return False
+    
+    def _backup_data_file(self):
+        """
+        データファイルのバックアップを作成
+        
+        save_data() でファイル全体を os.replace で置き換える直前にのみ呼び出し、
+        置き換え前のファイルをハードリンクで残します（SDカードへの書き込みなし）。
+        """
+        if not (self.config.backup_enabled and self.data_file.exists()):
             return
         
+        backup_file = self.data_file.with_suffix('.json.bak')
         try:
-            os.chdir(self.repo_path)
-            
-            # Gitの状態確認
-            result = subprocess.run(['git', 'status', '--porcelain'], 
-                                  capture_output=True, text=True, check=True)
-            
-            if not result.stdout.strip():
-                self._log("変更がないためプッシュをスキップします")
+            try:
+                backup_file.unlink(missing_ok=True)
+                os.link(self.data_file, backup_file)
                 return
+            except OSError:
+                pass  # ハードリンク非対応のファイルシステムの場合のみコピーする
             
-            # ファイルをステージング
-            subprocess.run(['git', 'add', '.'], check=True)
+            # copyfileはLinuxではsendfileでカーネル内コピーを行う
+            shutil.copyfile(self.data_file, backup_file)
+        except OSError as e:
+            self._log(f"バックアップ作成エラー: {e}", level='WARNING')
+    
+    def git_push(self):
+        """
+        データの変更をコミットし、push_batch_size件ごとにGitHubへプッシュ
+        
+        コミットはローカル操作のため毎回行い、ネットワーク通信を伴う
+        プッシュのみをまとめて実行します。
+        """
+        if not self.config.auto_push:
+            return
+        
+        try:
+            commit_message = f"{self.config.commit_message} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             
-            # コミット
-            commit_message = f"{self.config['git']['commit_message']} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            subprocess.run(['git', 'commit', '-m', commit_message], check=True)
+            if self._commit_changes(commit_message):
+                self._unpushed_commits += 1
+            else:
+                self._log("変更がないためコミットをスキップします")
             
-            # プッシュ
-            remote = self.config['git']['remote_name']
-            branch = self.config['git']['branch_name']
-            subprocess.run(['git', 'push', remote, branch], check=True)
+        except subprocess.CalledProcessError as e:
+            self._log(f"Git操作エラー: {e}", level='ERROR')
+            return
+        except Exception as e:
+            self._log(f"予期しないエラー: {e}", level='ERROR')
+            return
+        
+        if self._unpushed_commits >= self.config.push_batch_size:
+            self.push_pending()
+    
+    def push_pending(self):
+        """未プッシュのコミットをGitHubにプッシュ"""
+        if self._unpushed_commits == 0:
+            return
+        
+        try:
+            remote = self.config.remote_name
+            branch = self.config.branch_name
+            self._git('push', '-q', remote, branch)
             
-            self._log("GitHubに正常にプッシュしました")
+            self._log(f"GitHubに正常にプッシュしました（{self._unpushed_commits}コミット）")
+            self._unpushed_commits = 0
             
         except subprocess.CalledProcessError as e:
             self._log(f"Git操作エラー: {e}", level='ERROR')
         except Exception as e:
             self._log(f"予期しないエラー: {e}", level='ERROR')
     
+    def _open_repository(self):
+        """
+        pygit2でリポジトリを開く
+        
+        Returns:
+            pygit2.Repository: 開けない場合（pygit2未インストールを含む）はNone
+        """
+        if pygit2 is None:
+            return None
+        
+        try:
+            return pygit2.Repository(str(self.repo_path))
+        except (pygit2.GitError, KeyError) as e:
+            self._log(f"pygit2でリポジトリを開けません（gitコマンドを使用）: {e}", level='WARNING')
+            return None
+    
+    def _commit_changes(self, message):
+        """
+        作業ツリーの変更をすべてステージングしてコミット
+        
+        Args:
+            message (str): コミットメッセージ
+            
+        Returns:
+            bool: コミットした場合True、変更が無い場合False
+        """
+        repo = self._repo
+        if repo is None:
+            # Gitの状態確認
+            result = self._git('status', '--porcelain', capture_output=True, text=True)
+            if not result.stdout.strip():
+                return False
+            
+            self._git('add', '.')
+            self._git('commit', '-q', '-m', message)
+            return True
+        
+        if not repo.status():
+            return False
+        
+        # 外部のgit操作を反映してからステージング
+        index = repo.index
+        index.read()
+        index.add_all()
+        index.write()
+        tree = index.write_tree()
+        
+        signature = repo.default_signature
+        parents = [] if repo.head_is_unborn else [repo.head.target]
+        repo.create_commit('HEAD', signature, signature, message, tree, parents)
+        return True
+    
+    def _git(self, *args, **kwargs):
+        """リポジトリのディレクトリでgitコマンドを実行"""
+        return subprocess.run(['git', *args], cwd=self.repo_path, check=True, **kwargs)
+    
     def cleanup_old_data(self, data_list, days=30):
         """
         古いデータをクリーンアップ
@@ -217,16 +477,16 @@ class TemperatureHumidityLogger:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         cutoff_iso = cutoff_date.isoformat() + 'Z'
         
-        filtered_data = [
-            item for item in data_list 
-            if item.get('timestamp', '') >= cutoff_iso
-        ]
-        
-        removed_count = len(data_list) - len(filtered_data)
-        if removed_count > 0:
-            self._log(f"古いデータ {removed_count}件を削除しました")
+        # データは時系列順に追記されるため二分探索で境界を求める
+        cutoff_index = bisect.bisect_left(
+            data_list, cutoff_iso,
+            key=lambda item: item.get('timestamp', '')
+        )
+        if cutoff_index == 0:
+            return data_list  # 削除なし（通常はこちら）のときは全件のコピーを作らない
         
-        return filtered_data
+        self._log(f"古いデータ {cutoff_index}件を削除しました")
+        return data_list[cutoff_index:]
     
     def run_once(self):
         """1回のデータ収集・保存・プッシュを実行"""
@@ -235,21 +495,34 @@ class TemperatureHumidityLogger:
         if sensor_data is None:
             return False
         
-        # 既存データ読み込み
-        existing_data = self.load_existing_data()
+        config = self.config
         
-        # 新しいデータを追加
+        # 新しいデータを追加（既存データはメモリ上のキャッシュを使用）
+        existing_data = self._data_cache
         existing_data.append(sensor_data)
         
+        needs_rewrite = False
+        
         # 古いデータをクリーンアップ（設定で有効な場合）
-        if self.config['data'].get('cleanup_days'):
-            existing_data = self.cleanup_old_data(
+        if config.cleanup_days:
+            cleaned_data = self.cleanup_old_data(
                 existing_data, 
-                self.config['data']['cleanup_days']
+                config.cleanup_days
             )
+            needs_rewrite = len(cleaned_data) != len(existing_data)
+            existing_data = cleaned_data
+        
+        # 件数上限を超えたら1%分まとめて削り、全書き換えの頻度を抑える
+        max_records = config.max_records
+        if len(existing_data) > max_records:
+            existing_data = existing_data[-(max_records - max_records // 100):]
+            needs_rewrite = True
+        
+        self._data_cache = existing_data
         
-        # データ保存
-        self.save_data(existing_data)
+        # データ保存（通常は末尾への追記のみ）
+        if needs_rewrite or not self.append_record(sensor_data):
+            self.save_data(existing_data)
         
         # GitHubにプッシュ
         self.git_push()
@@ -262,22 +535,32 @@ class TemperatureHumidityLogger:
     def run_continuous(self):
         """連続実行モード"""
         self._log("連続実行モードを開始します")
-        interval = self.config['sensor']['read_interval']
+        
+        # ループ内で変化しない値・メソッドはローカルに束縛
+        interval = self.config.read_interval
+        run_once = self.run_once
+        log = self._log
+        monotonic = time.monotonic
+        sleep = time.sleep
+        
+        # 実行時刻は単調時計上の絶対時刻で管理し、周期の誤差を累積させない
+        next_tick = monotonic()
         
         try:
             while True:
-                start_time = time.time()
+                next_tick += interval
                 
-                success = self.run_once()
+                success = run_once()
                 if not success:
-                    self._log("データ収集に失敗しました", level='WARNING')
+                    log("データ収集に失敗しました", level='WARNING')
                 
                 # 次の実行まで待機
-                elapsed = time.time() - start_time
-                sleep_time = max(0, interval - elapsed)
-                
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+                delay = next_tick - monotonic()
+                if delay > 0:
+                    sleep(delay)
+                else:
+                    # 周期に間に合わなかった場合は現在時刻から再同期
+                    next_tick = monotonic()
                 
         except KeyboardInterrupt:
             self._log("ユーザーによって停止されました")
@@ -285,24 +568,13 @@ class TemperatureHumidityLogger:
             self._log(f"予期しないエラー: {e}", level='ERROR')
             raise
         finally:
+            self.push_pending()
             self.sensor.cleanup()
             self._log("センサーをクリーンアップしました")
     
     def _log(self, message, level='INFO'):
         """ログ出力"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_message = f"[{timestamp}] {level}: {message}"
-        
-        if self.config['logging']['console_output']:
-            print(log_message)
-        
-        # ログファイルへの出力（オプション）
-        if self.config['logging'].get('log_file'):
-            try:
-                with open(self.config['logging']['log_file'], 'a') as f:
-                    f.write(log_message + '\n')
-            except IOError:
-                pass  # ログファイル書き込みエラーは無視
+        self.logger.log(_LOG_LEVELS[level], message)
 
 
 def main():
@@ -319,16 +591,21 @@ def main():
     
     args = parser.parse_args()
     
+    # systemctl stop（SIGTERM）でも finally の後処理（未プッシュのコミットのプッシュ、
+    # センサーのクリーンアップ）とログの書き出しが行われるよう、SystemExitに変換する
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     try:
         logger = TemperatureHumidityLogger(args.config)
         
         # テストモードの場合はGitプッシュを無効化
         if args.test:
-            logger.config['git']['auto_push'] = False
+            logger.config = replace(logger.config, auto_push=False)
             print("テストモード: Gitプッシュは無効です")
         
         if args.once:
             success = logger.run_once()
+            logger.push_pending()
             sys.exit(0 if success else 1)
         else:
             logger.run_continuous()
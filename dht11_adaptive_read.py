@@ -4,6 +4,10 @@ DHT11 適応的読み取りツール
 タイミングに適応して読み取りを行います
 """
 
+import array
+import json
+from pathlib import Path
+
 try:
     import pigpio
     import time
@@ -11,6 +15,71 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
+from dht11_common import (BIT_DIGITS, BIT_THRESHOLD_US, calc_checksum, decode_frame,
+                          high_times, realtime_priority)
+
+# 1フレームで記録するエッジ数の上限（開始信号2 + 応答3 + データ80 + 終端1）
+EDGE_BUFFER_SIZE = 128
+
+# ポーリングのタイムアウト（ns、整数比較のみで判定する）
+RISE_TIMEOUT_NS = 1_000_000       # 1ms
+RESPONSE_WINDOW_NS = 15_000_000   # 15ms
+
+# 開始信号のパルス幅（μs）
+START_LOW_US = 18000
+START_HIGH_US = 30
+
+# 試行する安定化時間（s）と、読み取りに成功した値の保存先
+WAIT_TIMES = (0.5, 1.0, 2.0)
+CALIBRATION_FILE = Path.home() / '.dht11_cal.json'
+
+def load_calibration():
+    """
+    前回成功時のキャリブレーション値を読み込み
+    
+    Returns:
+        dict: {'wait_time': float, 'rise_time_us': float}、未保存の場合はNone
+    """
+    try:
+        with open(CALIBRATION_FILE, 'r', encoding='utf-8') as f:
+            calibration = json.load(f)
+        return {
+            'wait_time': float(calibration['wait_time']),
+            'rise_time_us': float(calibration['rise_time_us']),
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        return None  # 不正なファイルはキャリブレーションなしとして扱う
+
+def save_calibration(wait_time, rise_time_us):
+    """読み取りに成功した安定化時間と立ち上がり時間を保存"""
+    try:
+        with open(CALIBRATION_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'wait_time': wait_time, 'rise_time_us': round(rise_time_us, 1)}, f)
+    except OSError as e:
+        print(f"キャリブレーション保存エラー: {e}")
+
+def send_start_signal(pi, pin):
+    """
+    開始信号（LOW 18ms → HIGH 30μs）をDMAの波形出力で送信し、入力モードに切り替え
+    
+    time.sleep() と違いカーネルのスケジューリングに左右されず、
+    約1μsの精度でパルス幅が保たれます。
+    """
+    mask = 1 << pin
+    pi.wave_add_generic([
+        pigpio.pulse(0, mask, START_LOW_US),
+        pigpio.pulse(mask, 0, START_HIGH_US),
+    ])
+    wid = pi.wave_create()
+    try:
+        pi.wave_send_once(wid)
+        time.sleep((START_LOW_US - 1000) / 1_000_000)  # 送信完了の直前まではスリープ
+        while pi.wave_tx_busy():
+            pass
+        pi.set_mode(pin, pigpio.INPUT)
+    finally:
+        pi.wave_delete(wid)
+
 def adaptive_dht11_read():
     """適応的DHT11読み取り"""
     print("DHT11 適応的読み取りツール")
@@ -28,38 +97,54 @@ def adaptive_dht11_read():
         
         pin = 4
         
-        print("\n=== 診断1: プルアップ抵抗値の推定 ===")
+        # ループ内の属性参照を避けるためローカルに束縛
+        _read = pi.read
+        _now_ns = time.monotonic_ns
         
-        # プルアップ抵抗値の推定（立ち上がり時間から）
-        pi.set_mode(pin, pigpio.OUTPUT)
-        pi.write(pin, 0)
-        time.sleep(0.001)
+        calibration = load_calibration()
         
-        # 立ち上がり時間測定
-        pi.write(pin, 1)
-        pi.set_mode(pin, pigpio.INPUT)
-        
-        start_time = time.time()
-        while pi.read(pin) == 0 and (time.time() - start_time) < 0.001:
-            pass
-        
-        rise_time = (time.time() - start_time) * 1000000
-        print(f"立ち上がり時間: {rise_time:.1f}μs")
-        
-        if rise_time < 10:
-            print("推定: 適切なプルアップ抵抗（1-10kΩ）")
-            resistance_ok = True
-        elif rise_time < 50:
-            print("推定: 弱いプルアップ抵抗（10-47kΩ）")
-            resistance_ok = True
+        if calibration is not None:
+            # 前回成功した安定化時間から試行し、失敗時のみ残りを順に試す
+            rise_time = calibration['rise_time_us']
+            cached_wait = calibration['wait_time']
+            print(f"\nキャリブレーション済み（{CALIBRATION_FILE}）: "
+                  f"安定化時間 {cached_wait}s, 立ち上がり時間 {rise_time}μs")
+            wait_times = [cached_wait] + [w for w in WAIT_TIMES if w != cached_wait]
         else:
-            print("推定: プルアップ抵抗なしまたは極大値（>47kΩ）")
-            resistance_ok = False
+            print("\n=== 診断1: プルアップ抵抗値の推定 ===")
+            
+            # プルアップ抵抗値の推定（立ち上がり時間から）
+            pi.set_mode(pin, pigpio.OUTPUT)
+            pi.write(pin, 0)
+            time.sleep(0.001)
+            
+            # 立ち上がり時間測定
+            pi.write(pin, 1)
+            pi.set_mode(pin, pigpio.INPUT)
+            
+            start_ns = _now_ns()
+            while _read(pin) == 0 and (_now_ns() - start_ns) < RISE_TIMEOUT_NS:
+                pass
+            
+            rise_time = (_now_ns() - start_ns) / 1000
+            print(f"立ち上がり時間: {rise_time:.1f}μs")
+            
+            if rise_time < 10:
+                print("推定: 適切なプルアップ抵抗（1-10kΩ）")
+                resistance_ok = True
+            elif rise_time < 50:
+                print("推定: 弱いプルアップ抵抗（10-47kΩ）")
+                resistance_ok = True
+            else:
+                print("推定: プルアップ抵抗なしまたは極大値（>47kΩ）")
+                resistance_ok = False
+            
+            wait_times = WAIT_TIMES
         
         print("\n=== 診断2: 適応的タイミング測定 ===")
         
         # より長いウェイト時間で試行
-        for wait_time in [0.5, 1.0, 2.0]:
+        for wait_time in wait_times:
             print(f"\n安定化時間 {wait_time}s で試行:")
             
             # 安定化
@@ -67,34 +152,33 @@ def adaptive_dht11_read():
             pi.write(pin, 1)
             time.sleep(wait_time)
             
-            # 開始信号
-            pi.write(pin, 0)
-            time.sleep(0.018)  # 18ms
-            pi.write(pin, 1)
-            time.sleep(0.000030)  # 30μs
-            pi.set_mode(pin, pigpio.INPUT)
-            
-            # 応答測定
-            state_changes = []
-            start_time = time.time()
-            last_state = pi.read(pin)
-            
-            timeout = 0.015  # 15ms
-            while (time.time() - start_time) < timeout:
-                current_state = pi.read(pin)
-                current_time = time.time()
+            # 開始信号〜応答測定はリアルタイム優先度で実行
+            with realtime_priority():
+                # 開始信号
+                send_start_signal(pi, pin)
                 
-                if current_state != last_state:
-                    duration = (current_time - start_time) * 1000000
-                    state_changes.append({
-                        'time_us': duration,
-                        'from_state': last_state,
-                        'to_state': current_state
-                    })
-                    last_state = current_state
-                    
-                    if len(state_changes) >= 10:  # 最初の10変化で十分
+                # 応答測定
+                state_changes = []
+                start_ns = _now_ns()
+                last_state = _read(pin)
+                
+                while True:
+                    current_state = _read(pin)
+                    elapsed_ns = _now_ns() - start_ns
+                    if elapsed_ns >= RESPONSE_WINDOW_NS:
                         break
+                    
+                    if current_state != last_state:
+                        duration = elapsed_ns / 1000
+                        state_changes.append({
+                            'time_us': duration,
+                            'from_state': last_state,
+                            'to_state': current_state
+                        })
+                        last_state = current_state
+                        
+                        if len(state_changes) >= 10:  # 最初の10変化で十分
+                            break
             
             print(f"  検出された状態変化数: {len(state_changes)}")
             
@@ -130,6 +214,7 @@ def adaptive_dht11_read():
                         print("  → この設定で完全読み取りを試行")
                         success = attempt_full_read(pi, pin, wait_time)
                         if success:
+                            save_calibration(wait_time, rise_time)
                             break
             else:
                 print("  応答不十分")
@@ -145,112 +230,74 @@ def attempt_full_read(pi, pin, stabilize_time):
     """完全データ読み取り試行"""
     print(f"\n=== 完全読み取り試行（安定化時間{stabilize_time}s）===")
     
+    # エッジ記録用バッファ（pigpioデーモンが付与するμs単位のtickを保存）
+    levels = array.array('B', bytes(EDGE_BUFFER_SIZE))
+    ticks = array.array('L', [0] * EDGE_BUFFER_SIZE)
+    edge_count = 0
+    
+    def _on_edge(gpio, level, tick):
+        nonlocal edge_count
+        if level < 2 and edge_count < EDGE_BUFFER_SIZE:  # 2はウォッチドッグ通知
+            levels[edge_count] = level
+            ticks[edge_count] = tick
+            edge_count += 1
+    
+    cb = None
     try:
         # 安定化
         pi.set_mode(pin, pigpio.OUTPUT)
         pi.write(pin, 1)
         time.sleep(stabilize_time)
         
-        # 開始信号
-        pi.write(pin, 0)
-        time.sleep(0.018)
-        pi.write(pin, 1)
-        time.sleep(0.000030)
-        pi.set_mode(pin, pigpio.INPUT)
-        
-        # 応答待ち（適応的タイムアウト）
-        start_time = time.time()
-        
-        # 応答LOW待ち
-        timeout = 0.001  # 1ms
-        while pi.read(pin) == 1 and (time.time() - start_time) < timeout:
-            pass
-        
-        if pi.read(pin) != 0:
-            print("応答LOW検出失敗")
-            return False
-        
-        print("応答LOW検出")
-        
-        # 応答LOW終了待ち
-        low_start = time.time()
-        while pi.read(pin) == 0 and (time.time() - low_start) < 0.0002:  # 200μs
-            pass
+        # エッジのtickはpigpioデーモンが付けるため、この区間はリアルタイム優先度にしない
+        # 開始信号の前にエッジコールバックを登録
+        cb = pi.callback(pin, pigpio.EITHER_EDGE, _on_edge)
         
-        if pi.read(pin) != 1:
-            print("応答HIGH検出失敗")
-            return False
+        # 開始信号
+        send_start_signal(pi, pin)
         
-        print("応答HIGH検出")
+        # フレーム全体（最大約5ms）の受信を待ってから一括で解析
+        time.sleep(0.010)
+        cb.cancel()
+        cb = None
         
-        # 応答HIGH終了待ち
-        high_start = time.time()
-        while pi.read(pin) == 1 and (time.time() - high_start) < 0.0002:  # 200μs
-            pass
+        print(f"検出エッジ数: {edge_count}")
         
-        if pi.read(pin) != 0:
-            print("データ開始検出失敗")
+        # 記録したエッジを (level, tick) の組にまとめ、他のツールと同じ処理で復号
+        edges = list(zip(levels[:edge_count], ticks[:edge_count]))
+        data_bytes, status = decode_frame(edges)
+        if status == 'NO_RESPONSE':
+            print("応答検出失敗")
             return False
         
-        print("データ開始検出")
+        # 開始信号の立ち上がりの次から応答（LOW → HIGH → LOW）とデータが続く
+        start = next(i for i, (level, _) in enumerate(edges) if level == 1)
+        print(f"応答HIGH期間: {high_times(edges[start + 1:start + 4])[0]}μs")
         
-        # データビット読み取り（適応的タイミング）
-        bits = []
+        # ビット判定（26-28μs: 0, 70μs: 1）を一括で行い、1つの整数に詰める
+        data_durations = high_times(edges[start + 3:start + 84])
+        bit_count = len(data_durations)
+        bits = bytes(dt > BIT_THRESHOLD_US for dt in data_durations)
+        frame = int(bits.translate(BIT_DIGITS), 2) if bits else 0
         
-        for bit_index in range(40):
-            # LOW期間待ち
-            low_start = time.time()
-            while pi.read(pin) == 0 and (time.time() - low_start) < 0.0001:  # 100μs
-                pass
-            
-            if pi.read(pin) != 1:
-                print(f"ビット{bit_index}: HIGH検出失敗")
-                break
-            
-            # HIGH期間測定
-            high_start = time.time()
-            while pi.read(pin) == 1 and (time.time() - high_start) < 0.0001:  # 100μs
-                pass
-            
-            high_duration = (time.time() - high_start) * 1000000
-            
-            # ビット判定（適応的閾値）
-            if high_duration > 35:  # 35μs以上で'1'
-                bits.append('1')
-            else:
-                bits.append('0')
-            
-            # 8ビットごとに表示
-            if (bit_index + 1) % 8 == 0:
-                byte_bits = bits[-8:]
-                byte_str = ''.join(byte_bits)
-                byte_val = int(byte_str, 2)
-                print(f"バイト{(bit_index + 1)//8}: {byte_str} = {byte_val}")
+        for i in range(bit_count // 8):
+            byte_val = (frame >> (bit_count - 8 * (i + 1))) & 0xFF
+            print(f"バイト{i + 1}: {byte_val:08b} = {byte_val}")
         
-        print(f"読み取り完了: {len(bits)}/40 ビット")
+        print(f"読み取り完了: {bit_count}/40 ビット")
         
-        if len(bits) == 40:
+        if data_bytes is not None:
             # データ解析
-            bytes_data = []
-            for i in range(5):
-                byte_bits = bits[i*8:(i+1)*8]
-                byte_val = int(''.join(byte_bits), 2)
-                bytes_data.append(byte_val)
-            
-            humidity_int = bytes_data[0]
-            humidity_dec = bytes_data[1]
-            temp_int = bytes_data[2]
-            temp_dec = bytes_data[3]
-            checksum = bytes_data[4]
+            humidity_int, humidity_dec, temp_int, temp_dec, checksum = data_bytes
             
-            calculated_checksum = (bytes_data[0] + bytes_data[1] + bytes_data[2] + bytes_data[3]) & 0xFF
+            calculated_checksum = calc_checksum(data_bytes)
             
             print(f"\n--- データ解析 ---")
             print(f"湿度: {humidity_int}.{humidity_dec}%")
             print(f"温度: {temp_int}.{temp_dec}°C")
             print(f"チェックサム: {checksum} (計算値: {calculated_checksum})")
             
-            if checksum == calculated_checksum:
+            if status == 'OK':
                 print("✅ チェックサム: 正常")
                 print("🎉 DHT11読み取り成功!")
                 return True
@@ -265,6 +312,9 @@ def attempt_full_read(pi, pin, stabilize_time):
     except Exception as e:
         print(f"読み取りエラー: {e}")
         return False
+    finally:
+        if cb is not None:
+            cb.cancel()
 
 if __name__ == "__main__":
     try:
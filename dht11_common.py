@@ -0,0 +1,400 @@
+"""
+DHT11関連スクリプトの共通ユーティリティ
+"""
+
+import atexit
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+# mlockall() のフラグ（<sys/mman.h>）
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+except OSError:
+    _libc = None
+
+# realtime_priority() の入れ子の深さ（最も外側でのみ設定を変更する）
+_realtime_depth = 0
+
+# カーネルの isolcpus= で分離されたCPUの一覧
+ISOLATED_CPUS_FILE = '/sys/devices/system/cpu/isolated'
+
+# get_pi() で共有するpigpioデーモンへの接続
+_pi = None
+
+# 40ピンヘッダのGPIOを持つgpiochipの候補（Pi 5の古いカーネルでは4番）
+LGPIO_CHIPS = (0, 4)
+
+# 1フレームのエッジ数（開始信号2 + 応答3 + データ80）
+FRAME_EDGES = 85
+
+# lgpioでは入力に切り替えてからのエッジのみ記録される（開始信号の2つを除く）
+LGPIO_FRAME_EDGES = FRAME_EDGES - 2
+
+# フレーム全体の受信を待つ最大時間（s）
+FRAME_TIMEOUT = 0.05
+
+# 開始信号の最後のHIGH期間（μs）
+START_HIGH_US = 40
+
+# ビット判定の閾値（μs、26-28μs=0, 70μs=1 の間）
+BIT_THRESHOLD_US = 40
+
+# RPi.GPIOのポーリングで計測する場合のビット判定の閾値（ns、Python側の遅延を見込んで短め）
+POLL_BIT_THRESHOLD_NS = 35_000
+
+# 0/1 のバイト列を '0'/'1' の文字列に変換する表（int(..., 2) で一括変換するため）
+BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def calc_checksum(data_bytes):
+    """
+    DHT11フレームのチェックサム（先頭4バイトの和の下位8ビット）を計算
+    
+    Args:
+        data_bytes: 5バイト（以上）のデータ（bytes, bytearray, list など）
+        
+    Returns:
+        int: 計算したチェックサム（5バイト目と一致すれば正常）
+    """
+    return (data_bytes[0] + data_bytes[1] + data_bytes[2] + data_bytes[3]) & 0xFF
+
+
+def capture_frame(pi, pin, start_low_us=18000, pull=None):
+    """
+    pigpioで開始信号を送信し、応答〜データのエッジを記録
+    
+    開始信号はDMAの波形出力で送信し、各エッジにはpigpioデーモンが
+    μs単位のtickを付けます。Python側ではピンをポーリングしません。
+    
+    Args:
+        pi (pigpio.pi): pigpioデーモンへの接続
+        pin (int): DHT11のデータピン番号（BCM番号）
+        start_low_us (int): 開始信号のLOW期間（μs）
+        pull (int): 入力に切り替えた後のプルアップ/ダウン設定（Noneの場合は変更しない）
+        
+    Returns:
+        list: (level, tick) のリスト（開始信号のエッジを含む）
+    """
+    mask = 1 << pin
+    frame_ready = threading.Event()
+    
+    # コールバック内でタプルやリストの伸長が発生しないよう、レベルとtickを
+    # 別々の固定長バッファに記録し、(level, tick) の組は受信完了後にまとめて作る
+    levels = bytearray(FRAME_EDGES)
+    ticks = array('I', [0]) * FRAME_EDGES
+    count = 0
+    
+    def on_edge(gpio, level, tick):
+        nonlocal count
+        if level > 1 or count >= FRAME_EDGES:  # 2はウォッチドッグ通知
+            return
+        levels[count] = level
+        ticks[count] = tick
+        count += 1
+        if count == FRAME_EDGES:
+            frame_ready.set()
+    
+    pi.set_mode(pin, pigpio.OUTPUT)
+    pi.write(pin, 1)
+    
+    pi.wave_add_generic([
+        pigpio.pulse(0, mask, start_low_us),
+        pigpio.pulse(mask, 0, START_HIGH_US),
+    ])
+    wid = pi.wave_create()
+    
+    cb = pi.callback(pin, pigpio.EITHER_EDGE, on_edge)
+    try:
+        pi.wave_send_once(wid)
+        time.sleep((start_low_us + START_HIGH_US) / 1e6)
+        while pi.wave_tx_busy():
+            pass
+        
+        # 入力モードに切り替えてフレームの受信完了を待機
+        pi.set_mode(pin, pigpio.INPUT)
+        if pull is not None:
+            pi.set_pull_up_down(pin, pull)
+        frame_ready.wait(FRAME_TIMEOUT)
+    finally:
+        cb.cancel()
+        pi.wave_delete(wid)
+    
+    return list(zip(levels[:count], ticks[:count]))
+
+
+def capture_frame_lgpio(handle, pin, start_low_us=18000):
+    """
+    lgpioで開始信号を送信し、応答〜データのエッジを記録
+    
+    入力への切り替え後のエッジにはカーネルが割り込み時にタイムスタンプを付けて
+    キューに記録するため、pigpioデーモンが無くてもポーリングせずに記録できます。
+    開始信号はPython側で出力するため、そのエッジは記録されません。
+    
+    Args:
+        handle (int): open_lgpio_chip() で開いたgpiochipのハンドル
+        pin (int): DHT11のデータピン番号（BCM番号）
+        start_low_us (int): 開始信号のLOW期間（μs）
+        
+    Returns:
+        list: (level, tick) のリスト（tickはpigpioと同じμs単位の32bit値）
+        
+    Raises:
+        lgpio.error: GPIOの操作に失敗した場合
+    """
+    frame_ready = threading.Event()
+    
+    # capture_frame() と同様に、レベルとtickを別々の固定長バッファに記録
+    levels = bytearray(LGPIO_FRAME_EDGES)
+    ticks = array('I', [0]) * LGPIO_FRAME_EDGES
+    count = 0
+    
+    def on_edge(chip, gpio, level, timestamp):
+        nonlocal count
+        if level > 1 or count >= LGPIO_FRAME_EDGES:  # 2はウォッチドッグ通知
+            return
+        levels[count] = level
+        # ns単位のタイムスタンプをpigpioと同じμs単位の32bit tickにそろえる
+        ticks[count] = (timestamp // 1000) & 0xFFFFFFFF
+        count += 1
+        if count == LGPIO_FRAME_EDGES:
+            frame_ready.set()
+    
+    cb = lgpio.callback(handle, pin, lgpio.BOTH_EDGES, on_edge)
+    try:
+        # 開始信号: LOW → HIGH
+        lgpio.gpio_claim_output(handle, pin, 1)
+        lgpio.gpio_write(handle, pin, 0)
+        time.sleep(start_low_us / 1e6)
+        lgpio.gpio_write(handle, pin, 1)
+        
+        # プルアップ付きの入力に切り替え、エッジの記録を開始
+        lgpio.gpio_claim_alert(handle, pin, lgpio.BOTH_EDGES, lgpio.SET_PULL_UP)
+        frame_ready.wait(FRAME_TIMEOUT)
+    finally:
+        cb.cancel()
+        lgpio.gpio_free(handle, pin)
+    
+    return list(zip(levels[:count], ticks[:count]))
+
+
+def high_times(frame):
+    """
+    データ部のエッジから各ビットのHIGH期間を求める
+    
+    Args:
+        frame (list): データ開始の立ち下がりから始まる (level, tick) のリスト
+                      （各ビットは LOW → HIGH → 次のLOW の順に並ぶ）
+        
+    Returns:
+        list: 各ビットのHIGH期間（μs）
+    """
+    # 立ち上がり→立ち下がりの組からHIGH期間を求める
+    # （32bit tickのラップアラウンドは pigpio.tickDiff と同様にマスクで補正）
+    return [(fall_tick - rise_tick) & 0xFFFFFFFF
+            for (_, rise_tick), (_, fall_tick) in zip(frame[1::2], frame[2::2])]
+
+
+def decode_frame(edges):
+    """
+    記録したエッジからDHT11の5バイトのデータを復元
+    
+    Args:
+        edges (list): capture_frame() などで記録した (level, tick) のリスト
+        
+    Returns:
+        tuple: (data_bytes, status)
+            - data_bytes: 5バイトのデータ（応答なし・ビット不足の場合はNone）
+            - status: 'OK', 'NO_RESPONSE', 'READ_ERROR_<n>_BITS', 'CHECKSUM_ERROR'
+    """
+    # 開始信号の立ち上がり（LOWの終わり）の次から応答（HIGH→LOW→HIGH→LOW）が始まる
+    start = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
+    if start is None or [level for level, _ in edges[start + 1:start + 4]] != [0, 1, 0]:
+        return None, 'NO_RESPONSE'
+    
+    # 応答の最後のHIGH→LOWからデータが始まり、各ビットは LOW → HIGH → 次のLOW の順に並ぶ
+    frame = edges[start + 3:start + 84]
+    
+    # 各ビットのHIGH期間（μs）の比較結果をそのままビットにする
+    bits = bytearray(duration > BIT_THRESHOLD_US for duration in high_times(frame))
+    if len(bits) < 40:
+        return None, f'READ_ERROR_{len(bits)}_BITS'
+    
+    data_bytes = int(bits.translate(BIT_DIGITS), 2).to_bytes(5, 'big')
+    if calc_checksum(data_bytes) != data_bytes[4]:
+        return data_bytes, 'CHECKSUM_ERROR'
+    return data_bytes, 'OK'
+
+
+def read_frame(pi, pin, start_low_us=18000, pull=None):
+    """
+    pigpioでDHT11から1フレームを読み取り
+    
+    引数と戻り値は capture_frame() と decode_frame() を参照してください。
+    """
+    return decode_frame(capture_frame(pi, pin, start_low_us, pull))
+
+
+def get_pi():
+    """
+    プロセス内で共有するpigpioデーモンへの接続を取得
+    
+    最初の呼び出しで接続し、以降は同じ接続を返します。複数の診断ツールを
+    続けて実行しても接続は1回で済み、接続はプロセス終了時に閉じます。
+    
+    Returns:
+        pigpio.pi: 接続できない場合（pigpio未インストールを含む）はNone
+    """
+    global _pi
+    
+    if _pi is None:
+        if pigpio is None:
+            return None
+        
+        pi = pigpio.pi()
+        if not pi.connected:
+            pi.stop()
+            return None
+        
+        atexit.register(pi.stop)
+        _pi = pi
+    return _pi
+
+
+def open_lgpio_chip():
+    """
+    lgpioでGPIOのgpiochipを開く
+    
+    Returns:
+        int: gpiochipのハンドル、開けない場合（lgpio未インストールを含む）はNone
+    """
+    if lgpio is None:
+        return None
+    
+    for chip in LGPIO_CHIPS:
+        try:
+            handle = lgpio.gpiochip_open(chip)
+        except lgpio.error:
+            continue
+        
+        # ピン制御のgpiochip（pinctrl-bcm2711, pinctrl-rp1 など）のみ使用
+        _, _, _, label = lgpio.gpio_get_chip_info(handle)
+        if label.startswith('pinctrl-'):
+            return handle
+        lgpio.gpiochip_close(handle)
+    return None
+
+
+def isolated_cpus():
+    """
+    isolcpus= で通常のスケジューリングから分離されたCPU番号を取得
+    
+    Returns:
+        list: CPU番号のリスト（分離されたCPUが無い場合は空）
+    """
+    try:
+        with open(ISOLATED_CPUS_FILE, 'r') as f:
+            text = f.read().strip()
+    except OSError:
+        return []
+    
+    cpus = []
+    for part in filter(None, text.split(',')):
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+@contextmanager
+def realtime_priority(priority=50, cpu=None):
+    """
+    タイミングが重要な区間をリアルタイム優先度で実行
+    
+    区間内ではプロセスを1つのCPUコアに固定してSCHED_FIFOで実行し、
+    mlockall()でページフォルトを、ガベージコレクションの停止で
+    GCによる中断を防ぎます。権限（CAP_SYS_NICE や
+    RLIMIT_RTPRIO）が無い場合は変更できた設定のみ適用し、
+    区間の終了時に元の設定へ戻します。
+    
+    カーネルのコマンドライン（/boot/firmware/cmdline.txt）に isolcpus=3 の
+    ように指定してCPUを分離しておくと、そのCPUを優先して使用します。
+    
+    Args:
+        priority (int): SCHED_FIFOの優先度（1-99）
+        cpu (int): 固定するCPU番号（Noneの場合は分離されたCPU、無ければ最後のコア）
+    """
+    global _realtime_depth
+    
+    if _realtime_depth > 0:
+        _realtime_depth += 1
+        try:
+            yield
+        finally:
+            _realtime_depth -= 1
+        return
+    
+    saved_affinity = None
+    saved_policy = None
+    saved_param = None
+    memory_locked = False
+    gc_enabled = gc.isenabled()
+    
+    try:
+        affinity = os.sched_getaffinity(0)
+        if cpu is None:
+            cpu = next(iter(isolated_cpus()), max(affinity))
+        os.sched_setaffinity(0, {cpu})
+        saved_affinity = affinity
+    except (AttributeError, OSError):
+        pass
+    
+    try:
+        policy = os.sched_getscheduler(0)
+        param = os.sched_getparam(0)
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        saved_policy, saved_param = policy, param
+    except (AttributeError, OSError):
+        pass
+    
+    if _libc is not None:
+        memory_locked = _libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0
+    
+    gc.disable()
+    
+    _realtime_depth = 1
+    try:
+        yield
+    finally:
+        _realtime_depth = 0
+        
+        if gc_enabled:
+            gc.enable()
+        
+        if memory_locked:
+            _libc.munlockall()
+        
+        try:
+            if saved_policy is not None:
+                os.sched_setscheduler(0, saved_policy, saved_param)
+            if saved_affinity is not None:
+                os.sched_setaffinity(0, saved_affinity)
+        except OSError:
+            pass
@@ -1,10 +1,83 @@
 """
 DHT11温湿度センサー用自作ライブラリ
-RPi.GPIOを使用してDHT11センサーからデータを読み取ります
+pigpioデーモンまたはlgpio（Raspberry Pi 5対応）が使える場合はエッジを記録して、
+どちらも使えない場合はRPi.GPIOを使用してDHT11センサーからデータを読み取ります
 """
 
+import collections
+import logging
+import math
+import threading
 import time
-import RPi.GPIO as GPIO
+from array import array
+
+from dht11_common import (BIT_DIGITS, BIT_THRESHOLD_US, FRAME_EDGES, FRAME_TIMEOUT,
+                          POLL_BIT_THRESHOLD_NS, capture_frame_lgpio, open_lgpio_chip,
+                          realtime_priority)
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
+
+logger = logging.getLogger(__name__)
+
+# read() の戻り値（タプルとして (temperature, humidity, status) に展開できる）
+DHT11Reading = collections.namedtuple('DHT11Reading', 'temperature humidity status')
+
+# 開始信号後、DHT11の応答（LOW）を待つ時間（ms）
+RESPONSE_TIMEOUT_MS = 5
+
+# RPi.GPIOでのポーリング回数の上限（ボードごとのCPU速度に合わせる）
+# 前方一致で判定するため、名前が長いモデルを先に並べる
+TIMEOUT_ITERATIONS = (
+    ('Raspberry Pi 5', 100000),
+    ('Raspberry Pi 4', 50000),
+    ('Raspberry Pi 3', 30000),
+    ('Raspberry Pi Zero 2', 30000),
+    ('Raspberry Pi Zero', 10000),
+)
+DEFAULT_TIMEOUT_ITERATIONS = 50000
+
+# 応答待機（80μs）はデータビット待機の1/50の回数で打ち切る
+RESPONSE_TIMEOUT_DIVISOR = 50
+
+
+def detect_timeout_iterations():
+    """
+    ボードのモデルからポーリング回数の上限を決定
+    
+    モデルが不明な場合はCPUの最大クロックに比例させ（Pi 4の1.5GHzで
+    DEFAULT_TIMEOUT_ITERATIONS）、それも取得できない場合は既定値を返します。
+    
+    Returns:
+        int: データビット待機のポーリング回数の上限
+    """
+    try:
+        with open('/proc/device-tree/model', 'r') as f:
+            model = f.read().rstrip('\x00\n')
+        for prefix, iterations in TIMEOUT_ITERATIONS:
+            if model.startswith(prefix):
+                return iterations
+    except OSError:
+        pass
+    
+    try:
+        with open('/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq', 'r') as f:
+            max_freq_khz = int(f.read())
+        return max(10000, DEFAULT_TIMEOUT_ITERATIONS * max_freq_khz // 1500000)
+    except (OSError, ValueError):
+        return DEFAULT_TIMEOUT_ITERATIONS
 
 
 class DHT11:
@@ -19,6 +92,19 @@ class DHT11:
     - 8ビット: チェックサム
     """
     
+    # 前回の読み取り値を再利用する期間（s、DHT11は2秒に1回まで読み取り可能）
+    CACHE_TTL = 2.0
+    
+    # 開始信号を送る最小間隔（s、DHT11のサンプリング周期）
+    MIN_READ_INTERVAL = 1.0
+    
+    # リトライ間隔（s、0.25s → 0.5s → 1s … と倍にし、上限で打ち切る）
+    RETRY_BASE_DELAY = 0.25
+    RETRY_MAX_DELAY = 2.0
+    
+    # 保持する過去の読み取り値の数
+    HISTORY_SIZE = 8
+    
     def __init__(self, pin):
         """
         初期化
@@ -27,130 +113,352 @@ class DHT11:
             pin (int): DHT11のデータピン番号（BCM番号）
         """
         self.pin = pin
-        self.last_valid_time = 0
-        self.last_temperature = None
-        self.last_humidity = None
+        self._last_attempt_time = float('-inf')
+        # 正常に読み取った値の履歴（古い順）
+        # 各要素は (単調時計の時刻, [湿度整数部, 湿度小数部, 温度整数部, 温度小数部])
+        # DHT11の分解能は1桁なので浮動小数点数ではなく1バイトずつ保持する
+        self._history = collections.deque(maxlen=self.HISTORY_SIZE)
+        # 最後に正常に読み取った5バイトのフレーム（湿度・温度・チェックサム）
+        self.last_frame = None
         
-        # GPIO設定
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
+        # pigpioのエッジコールバックで記録した (level, tick) の列
+        self._edges = collections.deque(maxlen=FRAME_EDGES)
+        self._frame_ready = threading.Event()
+        self._pi = self._connect_pigpio()
+        self._start_wave = None
+        self._callback = None
+        if self._pi is not None:
+            self._prepare_pigpio()
+        
+        # pigpioが使えない場合はlgpio（gpiochipを直接使用）を試す
+        self._lgpio_handle = None
+        if self._pi is None:
+            self._lgpio_handle = open_lgpio_chip()
+        
+        # どちらも使えない場合のみRPi.GPIOを使用
+        if self._pi is None and self._lgpio_handle is None:
+            if GPIO is None:
+                raise RuntimeError("pigpio・lgpioが使えず、RPi.GPIOもインストールされていません")
+            
+            # GPIO設定
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setwarnings(False)
+            
+            self._timeout_iters = detect_timeout_iterations()
+            self._response_timeout_iters = self._timeout_iters // RESPONSE_TIMEOUT_DIVISOR
     
-    def read(self, debug=False):
+    def read(self, debug=False, max_age=CACHE_TTL):
         """
         温湿度データを読み取り
         
         Args:
-            debug (bool): デバッグ情報を出力するかどうか
+            debug (bool): チェックサムエラー時も32ビット以上あれば部分データを使うかどうか
+                （デバッグ情報はloggingのDEBUGレベルで出力されます）
+            max_age (float): この秒数以内に読み取った値があれば再利用する
         
         Returns:
-            tuple: (temperature, humidity, status)
+            DHT11Reading: (temperature, humidity, status)
                 - temperature: 温度（℃）
                 - humidity: 湿度（%）
                 - status: 読み取り結果（'OK', 'CHECKSUM_ERROR', 'TIMEOUT', 'NO_DATA'）
         """
-        # 前回の読み取りから2秒以上経過していることを確認
-        if time.time() - self.last_valid_time < 2:
-            return self.last_temperature, self.last_humidity, 'CACHE'
+        # 前回の読み取りから max_age 秒以上経過していることを確認
+        # （時刻合わせの影響を受けないよう単調時計で判定）
+        now = time.monotonic()
+        history = self._history
+        if history and now - history[-1][0] < max_age:
+            return DHT11Reading(self.last_temperature, self.last_humidity, 'CACHE')
         
-        if debug:
-            print(f"[DEBUG] GPIO{self.pin}の読み取り開始")
+        self._last_attempt_time = now
         
-        # センサーの開始信号を送信
-        if not self._start_signal():
-            if debug:
-                print("[DEBUG] 開始信号の送信に失敗")
-            return None, None, 'TIMEOUT'
-        
-        if debug:
-            print("[DEBUG] 開始信号送信成功、データ読み取り中...")
+        logger.debug("GPIO%dの読み取り開始", self.pin)
         
-        # データビットを読み取り
-        data_bits = self._read_data_bits()
+        if self._pi is not None:
+            # pigpioでフレーム全体のエッジを記録してからビットに変換
+            data_bits = self._read_frame_pigpio()
+        elif self._lgpio_handle is not None:
+            # lgpioでカーネルが記録したエッジからビットに変換
+            data_bits = self._read_frame_lgpio()
+        else:
+            # ポーリングで時間を測るため、開始信号〜データ受信はリアルタイム優先度で実行
+            with realtime_priority(priority=80):
+                # センサーの開始信号を送信
+                if not self._start_signal():
+                    logger.debug("開始信号の送信に失敗")
+                    return DHT11Reading(None, None, 'TIMEOUT')
+                
+                logger.debug("開始信号送信成功、データ読み取り中...")
+                
+                # データビットを読み取り
+                data_bits = self._read_data_bits()
         if not data_bits:
-            if debug:
-                print("[DEBUG] データビットの読み取りに失敗")
-            return None, None, 'NO_DATA'
+            logger.debug("データビットの読み取りに失敗")
+            return DHT11Reading(None, None, 'NO_DATA')
         
-        if debug:
-            print(f"[DEBUG] 読み取ったビット数: {len(data_bits)}")
-        
-        if debug:
-            print(f"[DEBUG] 読み取ったビット数: {len(data_bits)}")
+        logger.debug("読み取ったビット数: %d", len(data_bits))
         
         # データをバイトに変換
         data_bytes = self._bits_to_bytes(data_bits)
         if not data_bytes:
-            if debug:
-                print("[DEBUG] ビットからバイトへの変換に失敗")
-            return None, None, 'NO_DATA'
+            logger.debug("ビットからバイトへの変換に失敗")
+            return DHT11Reading(None, None, 'NO_DATA')
         
-        if debug:
-            print(f"[DEBUG] バイトデータ: {[hex(b) for b in data_bytes]}")
+        logger.debug("バイトデータ: %s", data_bytes.hex(' '))
         
         # チェックサムを検証
         if not self._verify_checksum(data_bytes):
+            logger.debug("チェックサムエラー: 計算値=%d, 受信値=%d", sum(data_bytes[:4]) & 0xFF, data_bytes[4])
             if debug:
-                print(f"[DEBUG] チェックサムエラー: 計算値={sum(data_bytes[:4]) & 0xFF}, 受信値={data_bytes[4]}")
                 # 部分読み取りの場合はチェックサムを無視して続行
                 if len(data_bits) >= 32:  # 最低限のデータがあれば使用
-                    print("[DEBUG] 部分データでチェックサム無視して続行")
+                    logger.debug("部分データでチェックサム無視して続行")
                 else:
-                    return None, None, 'CHECKSUM_ERROR'
+                    return DHT11Reading(None, None, 'CHECKSUM_ERROR')
             else:
-                return None, None, 'CHECKSUM_ERROR'
+                return DHT11Reading(None, None, 'CHECKSUM_ERROR')
         
         # 温湿度データを解析
         # 部分読み取りの場合は最初の32ビットから推定
         if len(data_bits) < 40:
-            if debug:
-                print(f"[DEBUG] 部分読み取りデータから推定計算")
-            # 最初の16ビット（湿度）から湿度を計算
-            humidity_bits = data_bits[:16] if len(data_bits) >= 16 else data_bits[:8] + [0] * 8
-            humidity_byte = 0
-            for i in range(min(8, len(humidity_bits))):
-                humidity_byte = (humidity_byte << 1) + humidity_bits[i]
-            humidity = humidity_byte
+            logger.debug("部分読み取りデータから推定計算")
+            # 32ビット以上あれば湿度・温度の整数部（1・3バイト目）は揃っている
+            humidity = data_bytes[0]
+            temperature = data_bytes[2]
+            fixed = (humidity, 0, temperature, 0)
             
-            # 次の16ビット（温度）から温度を計算
-            if len(data_bits) >= 24:
-                temp_bits = data_bits[16:24]
-                temp_byte = 0
-                for i in range(8):
-                    temp_byte = (temp_byte << 1) + temp_bits[i]
-                temperature = temp_byte
-            else:
-                temperature = 20  # デフォルト値
-                
-            if debug:
-                print(f"[DEBUG] 部分データ推定: 温度={temperature}°C, 湿度={humidity}%")
+            logger.debug("部分データ推定: 温度=%s°C, 湿度=%s%%", temperature, humidity)
         else:
             # 通常の処理
             humidity = data_bytes[0] + data_bytes[1] * 0.1
             temperature = data_bytes[2] + data_bytes[3] * 0.1
+            fixed = data_bytes[:4]
         
-        if debug:
-            print(f"[DEBUG] 解析結果: 温度={temperature}°C, 湿度={humidity}%")
+        logger.debug("解析結果: 温度=%s°C, 湿度=%s%%", temperature, humidity)
         
         # 値が妥当範囲内かチェック（部分読み取りの場合は緩和）
         if len(data_bits) < 40:
             # 部分読み取りの場合は緩い範囲チェック
             if not (0 <= humidity <= 150 and -10 <= temperature <= 100):
-                if debug:
-                    print(f"[DEBUG] 部分データ値が範囲外: 温度={temperature}, 湿度={humidity}")
-                return None, None, 'INVALID_RANGE'
+                logger.debug("部分データ値が範囲外: 温度=%s, 湿度=%s", temperature, humidity)
+                return DHT11Reading(None, None, 'INVALID_RANGE')
         else:
             # 完全読み取りの場合は厳密な範囲チェック
             if not (0 <= humidity <= 100 and -40 <= temperature <= 80):
-                if debug:
-                    print(f"[DEBUG] 値が範囲外: 温度={temperature}, 湿度={humidity}")
-                return None, None, 'INVALID_RANGE'
+                logger.debug("値が範囲外: 温度=%s, 湿度=%s", temperature, humidity)
+                return DHT11Reading(None, None, 'INVALID_RANGE')
         
         # 成功時は値を保存
-        self.last_valid_time = time.time()
-        self.last_temperature = temperature
-        self.last_humidity = humidity
+        history.append((now, array('B', fixed)))
+        self.last_frame = data_bytes
+        
+        return DHT11Reading(temperature, humidity, 'OK')
+    
+    @property
+    def last_valid_time(self):
+        """最後に正常に読み取った時刻（time.monotonic()）、未取得の場合は0"""
+        history = self._history
+        return history[-1][0] if history else 0
+    
+    @property
+    def last_temperature(self):
+        """最後に正常に読み取った温度（℃）、未取得の場合はNone"""
+        history = self._history
+        if not history:
+            return None
+        last = history[-1][1]
+        return last[2] + last[3] * 0.1
+    
+    @property
+    def last_humidity(self):
+        """最後に正常に読み取った湿度（%）、未取得の場合はNone"""
+        history = self._history
+        if not history:
+            return None
+        last = history[-1][1]
+        return last[0] + last[1] * 0.1
+    
+    def age(self):
+        """
+        最後に正常に読み取った値の経過時間（Age of Information）
+        
+        Returns:
+            float: 経過秒数、未取得の場合はNone
+        """
+        history = self._history
+        if not history:
+            return None
+        return time.monotonic() - history[-1][0]
+    
+    def recent(self, max_age=None):
+        """
+        履歴から経過時間が max_age 秒以内の値を新しい順に取得
+        
+        Args:
+            max_age (float): 取得する最大の経過秒数（Noneの場合は履歴すべて）
+            
+        Returns:
+            list: (経過秒数, temperature, humidity) のリスト
+        """
+        now = time.monotonic()
+        readings = []
+        for timestamp, last in reversed(self._history):
+            age = now - timestamp
+            if max_age is not None and age > max_age:
+                break
+            readings.append((age, last[2] + last[3] * 0.1, last[0] + last[1] * 0.1))
+        return readings
+    
+    def _connect_pigpio(self):
+        """
+        pigpioデーモンに接続
+        
+        Returns:
+            pigpio.pi: 接続できない場合（pigpio未インストールを含む）はNone
+        """
+        if pigpio is None:
+            return None
+        
+        pi = pigpio.pi()
+        if not pi.connected:
+            pi.stop()
+            return None
+        return pi
+    
+    def _prepare_pigpio(self):
+        """
+        pigpioでの読み取りに必要な設定を最初に1回だけ行う
         
-        return temperature, humidity, 'OK'
+        開始信号の波形、プルアップ、出力ラッチ（HIGH）、エッジコールバックは
+        読み取りごとに変わらないため、毎回の読み取りでは出力/入力の
+        切り替えと波形の送信だけを行います。
+        """
+        pi = self._pi
+        pin = self.pin
+        
+        # 出力ラッチをHIGHにしてから入力（プルアップ）で待機
+        # （次に出力へ切り替えたときに余分な立ち下がりが出ないようにする）
+        pi.set_pull_up_down(pin, pigpio.PUD_UP)
+        pi.write(pin, 1)
+        pi.set_mode(pin, pigpio.INPUT)
+        
+        self._create_start_wave()
+        
+        self._callback = pi.callback(pin, pigpio.EITHER_EDGE, self._on_edge)
+    
+    def _create_start_wave(self):
+        """
+        開始信号（18ms LOW → 40μs HIGH）の波形を作成
+        
+        波形はpigpioデーモン全体で共有されるため、他のクライアントが
+        wave_clear() した場合などは読み取り失敗後にこのメソッドで作り直します。
+        """
+        mask = 1 << self.pin
+        self._pi.wave_add_generic([
+            pigpio.pulse(0, mask, 18000),
+            pigpio.pulse(mask, 0, 40),
+        ])
+        self._start_wave = self._pi.wave_create()
+    
+    def _read_frame_lgpio(self):
+        """
+        lgpioでフレーム全体を記録してビット列に変換
+        
+        入力への切り替え後のエッジはカーネルがタイムスタンプ付きで
+        キューに記録するため、Python側ではポーリングしません。
+        
+        Returns:
+            list: ビットのリスト（40個、32ビット以上の部分読み取りを含む）、エラー時はNone
+        """
+        try:
+            edges = capture_frame_lgpio(self._lgpio_handle, self.pin)
+        except lgpio.error as e:
+            logger.warning("lgpio読み取りエラー: %s", e)
+            return None
+        
+        # 開始信号のHIGHは記録されないため、応答HIGHの1つだけを読み飛ばす
+        return self._decode_edges(edges, skip=1)
+    
+    def _on_edge(self, gpio, level, tick):
+        """pigpioのエッジコールバック（pigpioのスレッドから呼ばれる）"""
+        if level > 1:  # 2はウォッチドッグ通知
+            return
+        edges = self._edges
+        edges.append((level, tick))
+        if len(edges) >= FRAME_EDGES:
+            self._frame_ready.set()
+    
+    def _read_frame_pigpio(self):
+        """
+        pigpioでフレーム全体を記録してビット列に変換
+        
+        開始信号はDMAの波形出力で送信し、応答とデータのエッジは
+        pigpioデーモンがμs単位のtick付きで記録します。Python側では
+        ポーリングせず、フレームの受信完了を待ってからまとめて解析します。
+        
+        Returns:
+            list: ビットのリスト（40個、32ビット以上の部分読み取りを含む）、エラー時はNone
+        """
+        pi = self._pi
+        pin = self.pin
+        
+        self._edges.clear()
+        self._frame_ready.clear()
+        
+        try:
+            # 作成済みの開始信号の波形を送信（ラッチはHIGHのまま出力に切り替え）
+            pi.set_mode(pin, pigpio.OUTPUT)
+            try:
+                pi.wave_send_once(self._start_wave)
+                time.sleep(0.018)
+                while pi.wave_tx_busy():
+                    pass
+            finally:
+                # 入力モード（プルアップは設定済み）に戻す
+                pi.set_mode(pin, pigpio.INPUT)
+        except (pigpio.error, OSError) as e:
+            logger.warning("pigpio読み取りエラー: %s", e)
+            # 波形が削除された可能性があるため、次の読み取りに備えて作り直す
+            try:
+                pi.wave_delete(self._start_wave)
+            except (pigpio.error, OSError):
+                pass  # 既に削除されている
+            try:
+                self._create_start_wave()
+            except (pigpio.error, OSError) as e:
+                logger.warning("開始信号の波形を作成できません: %s", e)
+            return None
+        
+        # フレームの受信完了を待機
+        self._frame_ready.wait(FRAME_TIMEOUT)
+        
+        return self._decode_edges(list(self._edges))
+    
+    def _decode_edges(self, edges, skip=2):
+        """
+        記録したエッジ列からビット列を復元
+        
+        Args:
+            edges (list): (level, tick) のリスト
+            skip (int): データの前にあるHIGH期間の数（開始信号のHIGHとDHT11の応答HIGH）
+            
+        Returns:
+            list: ビットのリスト（40個、32ビット以上の部分読み取りを含む）、エラー時はNone
+        """
+        # 立ち上がり→立ち下がりの組からHIGH期間（μs）を求めてそのままビット判定
+        # （32bit tickのラップアラウンドは pigpio.tickDiff と同様にマスクで補正）
+        bits = [
+            int(((fall_tick - rise_tick) & 0xFFFFFFFF) > BIT_THRESHOLD_US)
+            for (rise_level, rise_tick), (fall_level, fall_tick) in zip(edges, edges[1:])
+            if rise_level == 1 and fall_level == 0
+        ]
+        
+        bits = bits[skip:skip + 40]
+        
+        if len(bits) < 40:
+            logger.debug("エッジからの読み取り: %dビット（エッジ数=%d）", len(bits), len(edges))
+            if len(bits) < 32:
+                return None
+        return bits
     
     def _start_signal(self):
         """
@@ -175,35 +483,35 @@ class DHT11:
             GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
             
             # DHT11の応答信号を待機（80μs LOW + 80μs HIGH）
-            # LOW信号の開始を待機（タイムアウト値を増加）
-            timeout_count = 0
+            # LOW信号の開始を待機（応答は解放から20-40μsで始まるため、
+            # 設定に数msかかる wait_for_edge ではなく経過時間の期限付きでポーリング）
+            deadline_ns = time.perf_counter_ns() + RESPONSE_TIMEOUT_MS * 1_000_000
             while GPIO.input(self.pin) == GPIO.HIGH:
-                timeout_count += 1
-                if timeout_count > 1000:
-                    print("[DEBUG] 応答待機1でタイムアウト")
+                if time.perf_counter_ns() > deadline_ns:
+                    logger.debug("応答待機1でタイムアウト")
                     return False
             
             # LOW信号の終了を待機
             timeout_count = 0
             while GPIO.input(self.pin) == GPIO.LOW:
                 timeout_count += 1
-                if timeout_count > 1000:
-                    print("[DEBUG] 応答待機2でタイムアウト")
+                if timeout_count > self._response_timeout_iters:
+                    logger.debug("応答待機2でタイムアウト")
                     return False
             
             # HIGH信号の終了を待機
             timeout_count = 0
             while GPIO.input(self.pin) == GPIO.HIGH:
                 timeout_count += 1
-                if timeout_count > 1000:
-                    print("[DEBUG] 応答待機3でタイムアウト")
+                if timeout_count > self._response_timeout_iters:
+                    logger.debug("応答待機3でタイムアウト")
                     return False
             
-            print("[DEBUG] 開始信号の応答確認完了")
+            logger.debug("開始信号の応答確認完了")
             return True
             
         except Exception as e:
-            print(f"開始信号エラー: {e}")
+            logger.warning("開始信号エラー: %s", e)
             return False
     
     def _read_data_bits(self):
@@ -211,51 +519,57 @@ class DHT11:
         40ビットのデータを読み取り
         
         Returns:
-            list: ビットのリスト（40個）、エラー時はNone
+            bytearray: ビット（0/1）の列（40個、32ビット以上の部分読み取りを含む）、エラー時はNone
         """
-        bits = []
+        # ループ内で伸長しないよう、40ビット分をあらかじめ確保してインデックスで代入
+        bits = bytearray(40)
+        high_times_ns = array('q', bytes(8 * 40))  # デバッグ用のHIGH期間（フレーム受信後にまとめて出力）
+        
+        # ポーリングループ内の属性参照を避けるためローカルに束縛
+        gpio_input = GPIO.input
+        HIGH = GPIO.HIGH
+        LOW = GPIO.LOW
+        pin = self.pin
+        now_ns = time.perf_counter_ns
+        timeout_iters = self._timeout_iters
         
         try:
             for i in range(40):
                 # 各ビットの開始（50μs LOW）を待機
                 timeout_count = 0
-                while GPIO.input(self.pin) == GPIO.LOW:
+                while gpio_input(pin) == LOW:
                     timeout_count += 1
-                    if timeout_count > 50000:  # さらにタイムアウトを増加
-                        print(f"[DEBUG] ビット{i}: LOW待機でタイムアウト (count={timeout_count})")
+                    if timeout_count > timeout_iters:
+                        logger.debug("ビット%d: LOW待機でタイムアウト (count=%d)", i, timeout_count)
                         return None
                 
-                # HIGH信号の時間を測定してビット判定
-                high_start = time.time()
+                # HIGH信号の時間を測定してビット判定（整数nsで計測）
+                high_start_ns = now_ns()
                 timeout_count = 0
-                while GPIO.input(self.pin) == GPIO.HIGH:
+                while gpio_input(pin) == HIGH:
                     timeout_count += 1
-                    if timeout_count > 50000:  # さらにタイムアウトを増加
-                        print(f"[DEBUG] ビット{i}: HIGH待機でタイムアウト (count={timeout_count})")
+                    if timeout_count > timeout_iters:
+                        logger.debug("ビット%d: HIGH待機でタイムアウト (count=%d)", i, timeout_count)
                         # タイムアウト時は部分的な結果でも返す
                         if i >= 32:  # 32ビット以上読めていれば部分成功とみなす
-                            print(f"[DEBUG] 部分読み取り: {i}ビット読み取り済み")
-                            return bits
+                            logger.debug("部分読み取り: %dビット読み取り済み", i)
+                            return bits[:i]
                         return None
                 
-                high_time = (time.time() - high_start) * 1000000  # マイクロ秒
+                high_ns = now_ns() - high_start_ns
                 
                 # 26-28μs: 0ビット, 70μs: 1ビット
-                # より柔軟な判定基準
-                if high_time > 35:  # 35μs以上なら1ビット
-                    bits.append(1)
-                else:
-                    bits.append(0)
-                
-                # デバッグ情報（最初の10ビットと最後の10ビット）
-                if i < 10 or i >= 30:
-                    print(f"[DEBUG] ビット{i}: HIGH時間={high_time:.1f}μs, 値={'1' if high_time > 35 else '0'}")
+                # より柔軟な判定基準（35μs以上なら1ビット）
+                bits[i] = high_ns > POLL_BIT_THRESHOLD_NS
+                high_times_ns[i] = high_ns
             
-            print(f"[DEBUG] 読み取り完了: {len(bits)}ビット")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("読み取り完了: %dビット, HIGH時間(μs)=%s", len(bits),
+                             [round(ns / 1000, 1) for ns in high_times_ns])
             return bits
             
         except Exception as e:
-            print(f"データ読み取りエラー: {e}")
+            logger.warning("データ読み取りエラー: %s", e)
             return None
     
     def _bits_to_bytes(self, bits):
@@ -266,44 +580,35 @@ class DHT11:
             bits (list): ビットリスト（通常40個、部分読み取りの場合はそれ以下）
             
         Returns:
-            list: バイト値のリスト、エラー時はNone
+            bytes: 5バイトのデータ、エラー時はNone
         """
         if len(bits) < 32:  # 最低32ビット（4バイト）必要
-            print(f"[DEBUG] ビット数不足: {len(bits)}ビット（最低32ビット必要）")
+            logger.debug("ビット数不足: %dビット（最低32ビット必要）", len(bits))
             return None
         
+        # 40ビットを1つの整数に詰め、バイトに分割
+        # （ビットごとのループではなく、bytes の変換と int() の基数変換で一括処理）
+        frame = int(bytes(bits[:40]).translate(BIT_DIGITS), 2)
+        
         # 40ビット未満の場合は0で埋める
         if len(bits) < 40:
-            bits = bits + [0] * (40 - len(bits))
-            print(f"[DEBUG] {40 - len(bits)}ビットを0で埋めました")
-        
-        bytes_data = []
-        for i in range(5):
-            byte_val = 0
-            for j in range(8):
-                if i * 8 + j < len(bits):
-                    byte_val = (byte_val << 1) + bits[i * 8 + j]
-                else:
-                    byte_val = byte_val << 1  # 0を追加
-            bytes_data.append(byte_val)
+            frame <<= 40 - len(bits)
+            logger.debug("%dビットを0で埋めました", 40 - len(bits))
         
-        return bytes_data
+        return frame.to_bytes(5, 'big')
     
-    def _verify_checksum(self, data_bytes):
+    @staticmethod
+    def _verify_checksum(data_bytes):
         """
         チェックサムを検証
         
         Args:
-            data_bytes (list): 5個のバイト値
+            data_bytes (bytes): 5バイトのデータ（_bits_to_bytes() の戻り値は常に5バイト）
             
         Returns:
             bool: チェックサムが正しい場合True
         """
-        if len(data_bytes) != 5:
-            return False
-        
-        checksum = (data_bytes[0] + data_bytes[1] + data_bytes[2] + data_bytes[3]) & 0xFF
-        return checksum == data_bytes[4]
+        return (data_bytes[0] + data_bytes[1] + data_bytes[2] + data_bytes[3]) & 0xFF == data_bytes[4]
     
     def read_retry(self, retries=3, debug=False):
         """
@@ -311,35 +616,84 @@ class DHT11:
         
         Args:
             retries (int): リトライ回数
-            debug (bool): デバッグ情報を出力するかどうか
+            debug (bool): read() の debug に渡す値
             
         Returns:
-            tuple: (temperature, humidity, status)
+            DHT11Reading: (temperature, humidity, status)
         """
         for attempt in range(retries):
-            if debug:
-                print(f"[DEBUG] 試行 {attempt + 1}/{retries}")
+            logger.debug("試行 %d/%d", attempt + 1, retries)
             
             temp, humidity, status = self.read(debug=debug)
             if status == 'OK':
-                return temp, humidity, status
+                return DHT11Reading(temp, humidity, status)
             
-            if debug:
-                print(f"[DEBUG] 試行 {attempt + 1} 失敗: {status}")
+            logger.debug("試行 %d 失敗: %s", attempt + 1, status)
             
             if attempt < retries - 1:
-                time.sleep(2)  # リトライ前に2秒待機
+                # 指数バックオフで待機（ただしセンサーの最小読み取り間隔は必ず空ける）
+                delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * (2 ** attempt))
+                remaining = self.MIN_READ_INTERVAL - (time.monotonic() - self._last_attempt_time)
+                time.sleep(max(delay, remaining))
         
-        return temp, humidity, status
+        return DHT11Reading(temp, humidity, status)
+    
+    def read_many(self, n, interval=3.0, retries=3):
+        """
+        一定間隔で複数回読み取り、列ごとにまとめて返す
+        
+        測定ごとのタプルのリストではなく、温度・湿度をそれぞれ
+        float32の配列にまとめるため、後から集計しやすくなります。
+        
+        Args:
+            n (int): 読み取り回数
+            interval (float): 読み取り間隔（s）
+            retries (int): read_retry() に渡すリトライ回数
+            
+        Returns:
+            tuple: (temperatures, humidities, statuses)
+                temperatures, humidities は array('f')（読み取り失敗はNaN）、statuses は状態のリスト
+        """
+        temperatures = array('f', [math.nan]) * n
+        humidities = array('f', [math.nan]) * n
+        statuses = [None] * n
+        
+        for i in range(n):
+            if i:
+                time.sleep(interval)
+            
+            temperature, humidity, status = self.read_retry(retries)
+            statuses[i] = status
+            if temperature is not None:
+                temperatures[i] = temperature
+                humidities[i] = humidity
+        
+        return temperatures, humidities, statuses
     
     def cleanup(self):
         """
         GPIO設定をクリーンアップ
         """
+        if self._pi is not None:
+            if self._callback is not None:
+                self._callback.cancel()
+                self._callback = None
+            if self._start_wave is not None:
+                self._pi.wave_delete(self._start_wave)
+                self._start_wave = None
+            self._pi.stop()
+            self._pi = None
+            return
+        
+        if self._lgpio_handle is not None:
+            lgpio.gpiochip_close(self._lgpio_handle)
+            self._lgpio_handle = None
+            return
+        
         try:
             GPIO.cleanup(self.pin)
         except Exception as e:
-            print(f"[DEBUG] GPIO cleanup エラー: {e}")
+            logger.debug("GPIO cleanup エラー: %s", e)
             # 全体をクリーンアップ
             GPIO.cleanup()
 
@@ -350,16 +704,15 @@ if __name__ == "__main__":
     sensor = DHT11(pin=4)
     
     try:
-        for i in range(10):
-            temperature, humidity, status = sensor.read_retry()
-            
+        # 3秒間隔で10回測定
+        temperatures, humidities, statuses = sensor.read_many(10, interval=3.0)
+        
+        for i, status in enumerate(statuses):
             if status == 'OK':
-                print(f"測定 {i+1}: 温度={temperature:.1f}°C, 湿度={humidity:.1f}%, 状態={status}")
+                print(f"測定 {i+1}: 温度={temperatures[i]:.1f}°C, 湿度={humidities[i]:.1f}%, 状態={status}")
             else:
                 print(f"測定 {i+1}: エラー - {status}")
             
-            time.sleep(3)  # 3秒間隔で測定
-            
     except KeyboardInterrupt:
         print("\n測定を停止しました")
     finally:
@@ -4,6 +4,8 @@ DHT11 高精度テスト - pigpioライブラリ使用版
 μs単位の精密制御でDHT11通信を行います
 """
 
+import threading
+
 try:
     import pigpio
     import time
@@ -17,6 +19,8 @@ except ImportError:
     print("  sudo systemctl enable pigpiod")
     print("  sudo systemctl start pigpiod")
 
+from dht11_common import BIT_THRESHOLD_US, FRAME_EDGES, FRAME_TIMEOUT, high_times
+
 class DHT11_PreciseTiming:
     """pigpioを使用した高精度DHT11クラス"""
     
@@ -30,8 +34,21 @@ class DHT11_PreciseTiming:
         if not self.pi.connected:
             raise RuntimeError("pigpioデーモンに接続できません。'sudo systemctl start pigpiod'を実行してください")
         
+        # エッジコールバックで記録した (level, tick) の列
+        self._edges = []
+        self._frame_ready = threading.Event()
+        self._data_start = 0
+        
         print(f"pigpio接続成功 (GPIO{pin})")
     
+    def _on_edge(self, gpio, level, tick):
+        """エッジコールバック（pigpioのスレッドから呼ばれる）"""
+        if level > 1:  # 2はウォッチドッグ通知
+            return
+        self._edges.append((level, tick))
+        if len(self._edges) >= FRAME_EDGES:
+            self._frame_ready.set()
+    
     def read_precise(self, debug=False):
         """高精度読み取り"""
         try:
@@ -47,9 +64,21 @@ class DHT11_PreciseTiming:
             if debug:
                 print(f"初期状態: {'HIGH' if initial_state else 'LOW'}")
             
-            # 開始信号送信（高精度）
-            if not self._send_start_signal_precise(debug):
-                return None, None, 'START_SIGNAL_FAILED'
+            # 開始信号の前にエッジの記録を開始し、応答〜データの全エッジを一度に受け取る
+            self._edges = []
+            self._frame_ready.clear()
+            cb = self.pi.callback(self.pin, pigpio.EITHER_EDGE, self._on_edge)
+            try:
+                # 開始信号送信（高精度）
+                if not self._send_start_signal_precise(debug):
+                    return None, None, 'START_SIGNAL_FAILED'
+                
+                self._frame_ready.wait(FRAME_TIMEOUT)
+            finally:
+                cb.cancel()
+            
+            if debug:
+                print(f"記録したエッジ数: {len(self._edges)}")
             
             # 応答信号確認
             if not self._wait_response_precise(debug):
@@ -92,30 +121,33 @@ class DHT11_PreciseTiming:
             # 出力モード設定
             self.pi.set_mode(self.pin, pigpio.OUTPUT)
             
-            # 18ms LOW信号
-            self.pi.write(self.pin, 0)
-            if debug:
-                print("開始信号: 18ms LOW開始")
-            time.sleep(0.018)  # 18ms
-            
-            # 40μs HIGH信号（高精度）
-            self.pi.write(self.pin, 1)
+            # 18ms LOW → 40μs HIGH を1つの波形にまとめ、DMAで送信
+            mask = 1 << self.pin
+            self.pi.wave_add_generic([
+                pigpio.pulse(0, mask, 18000),  # 18ms LOW
+                pigpio.pulse(mask, 0, 40),     # 40μs HIGH
+            ])
+            wid = self.pi.wave_create()
             if debug:
-                print("開始信号: 40μs HIGH開始")
+                print("開始信号: 18ms LOW + 40μs HIGH 波形送信")
             
-            # time.time()を使用したμs精度制御
-            start_time = time.time()
-            target_duration = 40e-6  # 40μs in seconds
-            while (time.time() - start_time) < target_duration:
-                pass  # 40μs待機（ビジーウェイト）
-            
-            # 入力モードに切り替え
-            self.pi.set_mode(self.pin, pigpio.INPUT)
-            self.pi.set_pull_up_down(self.pin, pigpio.PUD_UP)
+            # 波形はデーモン全体で共有されるため、作成した波形だけを削除する
+            try:
+                start_tick = self.pi.get_current_tick()
+                self.pi.wave_send_once(wid)
+                time.sleep(0.018)
+                while self.pi.wave_tx_busy():
+                    pass
+                
+                # 入力モードに切り替え
+                self.pi.set_mode(self.pin, pigpio.INPUT)
+                self.pi.set_pull_up_down(self.pin, pigpio.PUD_UP)
+            finally:
+                self.pi.wave_delete(wid)
             
             if debug:
-                actual_duration = (time.time() - start_time) * 1000000
-                print(f"開始信号完了、実際の待機時間: {actual_duration:.1f}μs")
+                actual_duration = pigpio.tickDiff(start_tick, self.pi.get_current_tick())
+                print(f"開始信号完了、送信開始からの経過時間: {actual_duration}μs")
             
             return True
             
@@ -125,38 +157,33 @@ class DHT11_PreciseTiming:
             return False
     
     def _wait_response_precise(self, debug=False):
-        """高精度応答信号待機"""
-        timeout_us = 100000  # 100ms タイムアウト
-        
+        """記録したエッジから応答信号を確認"""
         try:
             # DHT11応答: HIGH->LOW (80μs LOW) -> HIGH (80μs HIGH) -> LOW
+            edges = self._edges
             
-            # 1. HIGH->LOW変化待機
-            start_time = time.time()
-            while self.pi.read(self.pin) == 1:
-                if (time.time() - start_time) > 0.1:  # 100ms タイムアウト
-                    if debug:
-                        print("応答1: HIGH->LOW変化タイムアウト")
-                    return False
-            
-            # 2. LOW期間（約80μs）
-            start_time = time.time()
-            while self.pi.read(self.pin) == 0:
-                if (time.time() - start_time) > 0.1:  # 100ms タイムアウト
-                    if debug:
-                        print("応答2: LOW期間タイムアウト")
-                    return False
+            # 開始信号の立ち上がり（18ms LOWの終わり）の次から応答が始まる
+            start = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
+            if start is None:
+                if debug:
+                    print("開始信号のエッジを検出できません")
+                return False
             
-            # 3. HIGH期間（約80μs）
-            start_time = time.time()
-            while self.pi.read(self.pin) == 1:
-                if (time.time() - start_time) > 0.1:  # 100ms タイムアウト
+            # 1. HIGH->LOW変化 2. LOW期間（約80μs） 3. HIGH期間（約80μs）
+            response = edges[start + 1:start + 4]
+            for step, expected in enumerate((0, 1, 0), 1):
+                if len(response) < step or response[step - 1][0] != expected:
                     if debug:
-                        print("応答3: HIGH期間タイムアウト")
+                        print(f"応答{step}: 期待したエッジを検出できません")
                     return False
             
             if debug:
-                print("応答信号: 正常検出")
+                low_us = pigpio.tickDiff(response[0][1], response[1][1])
+                high_us = pigpio.tickDiff(response[1][1], response[2][1])
+                print(f"応答信号: 正常検出 (LOW={low_us}μs, HIGH={high_us}μs)")
+            
+            # データの最初のビットはHIGH→LOW（応答の最後のエッジ）から始まる
+            self._data_start = start + 3
             return True
             
         except Exception as e:
@@ -165,71 +192,31 @@ class DHT11_PreciseTiming:
             return False
     
     def _read_data_precise(self, debug=False):
-        """高精度データ読み取り"""
-        bits = []
-        timeout_us = 200  # 200μs タイムアウト
+        """記録したエッジからデータビットを読み取り"""
+        # 応答の後は各ビットが LOW開始(HIGH→LOW) → HIGH開始(LOW→HIGH) → 次のLOW開始 の順に並ぶ
+        frame = self._edges[self._data_start:self._data_start + 81]
         
-        try:
-            if debug:
-                print("データビット読み取り開始...")
-                print("最初の状態確認:")
-                initial_state = self.pi.read(self.pin)
-                print(f"  開始時のGPIO状態: {'HIGH' if initial_state else 'LOW'}")
-            
-            for i in range(40):
-                # LOW期間待機（50μs）
-                start_time = time.time()
-                low_wait_count = 0
-                
-                # GPIO状態の詳細監視
-                gpio_state = self.pi.read(self.pin)
-                if debug and i < 5:
-                    print(f"ビット{i}: 開始時GPIO={'HIGH' if gpio_state else 'LOW'}")
-                
-                while self.pi.read(self.pin) == 0:
-                    low_wait_count += 1
-                    if (time.time() - start_time) > 0.0002:  # 200μs タイムアウト
-                        if debug:
-                            print(f"ビット{i}: LOW期間タイムアウト (カウント={low_wait_count})")
-                            print(f"  最終GPIO状態: {'HIGH' if self.pi.read(self.pin) else 'LOW'}")
-                        return bits
-                
-                # LOW期間の測定
-                low_duration = (time.time() - start_time) * 1000000
-                
-                # HIGH期間測定
-                high_start = time.time()
-                high_wait_count = 0
-                
-                while self.pi.read(self.pin) == 1:
-                    high_wait_count += 1
-                    if (time.time() - high_start) > 0.0002:  # 200μs タイムアウト
-                        if debug:
-                            print(f"ビット{i}: HIGH期間タイムアウト (カウント={high_wait_count})")
-                            print(f"  最終GPIO状態: {'HIGH' if self.pi.read(self.pin) else 'LOW'}")
-                        return bits
-                
-                high_duration = (time.time() - high_start) * 1000000  # μs
-                
-                # ビット判定: 26-28μs=0, 70μs=1
-                bit_value = 1 if high_duration > 40 else 0
-                bits.append(bit_value)
-                
-                if debug and i < 10:
-                    print(f"ビット{i}: LOW={low_duration:.1f}μs, HIGH={high_duration:.1f}μs -> {bit_value}")
-                elif debug and i == 10:
+        # 各ビットのHIGH期間（pigpioのμs tick）を求め、26-28μs=0, 70μs=1 で判定
+        high_durations = high_times(frame)
+        bits = bytearray(duration > BIT_THRESHOLD_US for duration in high_durations)
+        
+        if debug:
+            print("データビット読み取り開始...")
+            print(f"  データ部のエッジ数: {len(frame)}")
+            for i, high_duration in enumerate(high_durations):
+                if 10 < i < 35:
+                    continue
+                if i == 10:
                     print("  ... (中略) ...")
-                elif debug and i >= 35:
-                    print(f"ビット{i}: LOW={low_duration:.1f}μs, HIGH={high_duration:.1f}μs -> {bit_value}")
+                    continue
+                low_duration = pigpio.tickDiff(frame[2 * i][1], frame[2 * i + 1][1])
+                print(f"ビット{i}: LOW={low_duration}μs, HIGH={high_duration}μs -> {bits[i]}")
             
-            if debug:
+            if len(bits) < 40:
+                print(f"ビット{len(bits)}: エッジ不足（記録数={len(self._edges)}）")
+            else:
                 print(f"データ読み取り完了: 40ビット")
-            return bits
-            
-        except Exception as e:
-            if debug:
-                print(f"データ読み取りエラー: {e}")
-            return bits
+        return bits
     
     def _bits_to_bytes(self, bits):
         """ビット→バイト変換"""
@@ -352,7 +339,7 @@ def main():
                 print(f"✗ 失敗: {status}")
             
             if i < 4:
-                time.sleep(2.5)
+                time.sleep(2.05)  # DHT11の最小読み取り間隔（2s）+ 余裕
         
         print(f"\n=== 結果 ===")
         print(f"成功率: {success_count}/5 ({success_count*20}%)")
@@ -11,6 +11,8 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
+from dht11_common import calc_checksum, get_pi, read_frame
+
 def test_pullup_solutions():
     """プルアップ問題の解決策テスト"""
     print("DHT11 プルアップ問題解決テスト")
@@ -21,8 +23,8 @@ def test_pullup_solutions():
         return
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
+        pi = get_pi()
+        if pi is None:
             print("pigpioデーモン未接続")
             return
         
@@ -58,8 +60,6 @@ def test_pullup_solutions():
         print("\n=== 解決策2: 配線診断と修正指示 ===")
         diagnose_wiring_issues(pi, pin)
         
-        pi.stop()
-        
     except Exception as e:
         print(f"エラー: {e}")
         import traceback
@@ -73,117 +73,25 @@ def attempt_read_with_internal_pullup(pi, pin):
         pi.write(pin, 1)
         time.sleep(1.0)
         
-        # 開始信号（長めに）
-        pi.write(pin, 0)
-        time.sleep(0.025)  # 25ms LOW
-        pi.write(pin, 1)
-        time.sleep(0.000050)  # 50μs HIGH
-        
-        # 内蔵プルアップ有効
-        pi.set_mode(pin, pigpio.INPUT)
-        pi.set_pull_up_down(pin, pigpio.PUD_UP)
-        
-        # 応答検出（柔軟なタイミング）
-        response_detected = wait_for_response(pi, pin)
-        if not response_detected:
-            return False
-        
-        # データ読み取り
-        bits = read_data_bits(pi, pin)
-        if len(bits) != 40:
-            print(f"データ不完全: {len(bits)}/40 ビット")
+        # 開始信号（長めに25ms LOW）を送信し、内蔵プルアップ有効で応答〜データを記録
+        bytes_data, status = read_frame(pi, pin, start_low_us=25000, pull=pigpio.PUD_UP)
+        if bytes_data is None:
+            print(f"データ読み取り失敗: {status}")
             return False
         
         # データ検証
-        return validate_dht11_data(bits)
+        return validate_dht11_data(bytes_data)
         
     except Exception as e:
         print(f"読み取りエラー: {e}")
         return False
 
-def wait_for_response(pi, pin):
-    """DHT11応答待ち（柔軟なタイミング）"""
-    # 応答LOW待ち（最大3ms）
-    timeout = 3000
-    count = 0
-    while pi.read(pin) == 1 and count < timeout:
-        count += 1
-    
-    if pi.read(pin) != 0:
-        print("応答LOW検出失敗")
-        return False
-    
-    print("応答LOW検出")
-    
-    # 応答LOW終了待ち
-    count = 0
-    while pi.read(pin) == 0 and count < timeout:
-        count += 1
-    
-    if pi.read(pin) != 1:
-        print("応答HIGH検出失敗")
-        return False
-    
-    print("応答HIGH検出")
-    
-    # 応答HIGH終了待ち
-    count = 0
-    while pi.read(pin) == 1 and count < timeout:
-        count += 1
-    
-    if pi.read(pin) != 0:
-        print("データ開始検出失敗")
-        return False
-    
-    print("データ開始検出")
-    return True
-
-def read_data_bits(pi, pin):
-    """データビット読み取り（柔軟な閾値）"""
-    bits = []
-    
-    for bit_index in range(40):
-        # LOW期間待ち
-        timeout = 2000
-        count = 0
-        while pi.read(pin) == 0 and count < timeout:
-            count += 1
-        
-        if pi.read(pin) != 1:
-            break
-        
-        # HIGH期間測定
-        high_start = time.time()
-        count = 0
-        while pi.read(pin) == 1 and count < timeout:
-            count += 1
-        
-        high_duration = (time.time() - high_start) * 1000000
-        
-        # 柔軟な閾値でビット判定
-        if high_duration > 25:  # 25μs以上で'1'
-            bits.append('1')
-        else:
-            bits.append('0')
-    
-    return bits
-
-def validate_dht11_data(bits):
-    """DHT11データ検証"""
-    if len(bits) != 40:
-        return False
-    
-    # バイト変換
-    bytes_data = []
-    for i in range(5):
-        byte_bits = bits[i*8:(i+1)*8]
-        byte_val = int(''.join(byte_bits), 2)
-        bytes_data.append(byte_val)
-    
+def validate_dht11_data(bytes_data):
+    """DHT11データ検証（bytes_data: 5バイトのデータ）"""
     humidity = bytes_data[0]
     temperature = bytes_data[2]
     checksum = bytes_data[4]
-    calculated_checksum = (sum(bytes_data[:4])) & 0xFF
+    calculated_checksum = calc_checksum(bytes_data)
     
     print(f"湿度: {humidity}%, 温度: {temperature}°C")
     print(f"チェックサム: {checksum} (計算値: {calculated_checksum})")
@@ -203,15 +111,15 @@ def diagnose_wiring_issues(pi, pin):
     pi.write(pin, 0)
     time.sleep(0.001)
     
-    start_time = time.time()
+    start_tick = pi.get_tick()
     pi.write(pin, 1)
     pi.set_mode(pin, pigpio.INPUT)
     pi.set_pull_up_down(pin, pigpio.PUD_OFF)
     
-    while pi.read(pin) == 0 and (time.time() - start_time) < 0.001:
+    while pi.read(pin) == 0 and pigpio.tickDiff(start_tick, pi.get_tick()) < 1000:
         pass
     
-    rise_time = (time.time() - start_time) * 1000000
+    rise_time = pigpio.tickDiff(start_tick, pi.get_tick())
     print(f"外部プルアップなし立ち上がり時間: {rise_time:.1f}μs")
     
     if rise_time > 100:
@@ -11,6 +11,8 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
+from dht11_common import get_pi, read_frame
+
 def test_step_by_step():
     """段階的配線確認"""
     print("DHT11 段階的配線確認")
@@ -21,8 +23,8 @@ def test_step_by_step():
         return
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
+        pi = get_pi()
+        if pi is None:
             print("pigpioデーモン未接続")
             return
         
@@ -78,30 +80,10 @@ def test_step_by_step():
         input("\n確認完了後、Enterを押してください...")
         
         print("\n=== ステップ5: センサー生存確認 ===")
-        # 内蔵プルアップを使用してセンサー応答を確認
-        pi.set_mode(pin, pigpio.OUTPUT)
-        pi.write(pin, 0)
-        time.sleep(0.020)  # 20ms LOW
-        pi.write(pin, 1)
-        time.sleep(0.00005)  # 50μs HIGH
-        
-        pi.set_mode(pin, pigpio.INPUT)
-        pi.set_pull_up_down(pin, pigpio.PUD_UP)
-        
-        # 応答確認
-        start_time = time.time()
-        response_detected = False
-        
-        initial_state = pi.read(pin)
-        print(f"開始信号送信後の初期状態: {initial_state}")
-        
-        # 1ms以内に応答があるかチェック
-        while (time.time() - start_time) < 0.001:
-            current_state = pi.read(pin)
-            if current_state != initial_state:
-                response_detected = True
-                print(f"状態変化検出: {initial_state} -> {current_state}")
-                break
+        # 内蔵プルアップを使用してセンサー応答を確認（20ms LOWの開始信号）
+        bytes_data, status = read_frame(pi, pin, start_low_us=20000, pull=pigpio.PUD_UP)
+        response_detected = status != 'NO_RESPONSE'
+        print(f"読み取り結果: {status}")
         
         if response_detected:
             print("✓ DHT11センサー: 応答あり（生きている）")
@@ -120,8 +102,6 @@ def test_step_by_step():
             print("1. 電源配線を再確認")
             print("2. 別のDHT11センサーで試行")
         
-        pi.stop()
-        
     except Exception as e:
         print(f"テストエラー: {e}")
 
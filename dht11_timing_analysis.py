@@ -11,6 +11,8 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
+from dht11_common import calc_checksum, capture_frame, get_pi, read_frame
+
 def analyze_dht11_timing():
     """詳細タイミング分析"""
     print("DHT11 詳細タイミング分析")
@@ -21,8 +23,8 @@ def analyze_dht11_timing():
         return
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
+        pi = get_pi()
+        if pi is None:
             print("pigpioデーモン未接続")
             return
         
@@ -35,42 +37,34 @@ def analyze_dht11_timing():
         pi.write(pin, 1)
         time.sleep(0.1)  # 安定化
         
-        print("開始信号送信:")
+        print("開始信号送信（DMAの波形出力）:")
         print("1. 18ms LOW送信")
-        pi.write(pin, 0)
-        time.sleep(0.018)  # 18ms LOW
-        
-        print("2. 20-40μs HIGH送信")
-        pi.write(pin, 1)
-        time.sleep(0.000030)  # 30μs HIGH
-        
+        print("2. 40μs HIGH送信")
         print("3. INPUT モードに切り替え")
-        pi.set_mode(pin, pigpio.INPUT)
         # プルアップ抵抗があるので内蔵プルアップは使わない
         
+        # 状態変化はpigpioデーモンがエッジごとにμs tick付きで記録する
+        # （Python側でpi.read()をポーリングしないため、取りこぼしが無い）
+        edges = capture_frame(pi, pin)
+        
         print("\n=== 分析2: 応答タイミング測定 ===")
         
-        # 詳細な応答タイミングを測定
+        # 開始信号の立ち上がり（18ms LOWの終わり）からの経過時間で表示
         measurements = []
-        start_time = time.time()
-        last_state = pi.read(pin)
         state_changes = []
+        release = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
         
-        # 最初の10ms間の状態変化を記録
-        timeout = 0.010  # 10ms
-        while (time.time() - start_time) < timeout:
-            current_state = pi.read(pin)
-            current_time = time.time()
-            
-            if current_state != last_state:
-                duration = (current_time - start_time) * 1000000  # μs
+        if release is not None:
+            start_tick = edges[release][1]
+            for current_state, current_tick in edges[release + 1:]:
+                duration = pigpio.tickDiff(start_tick, current_tick)  # μs
+                last_state = 1 - current_state
                 state_changes.append({
                     'time_us': duration,
                     'from_state': last_state,
                     'to_state': current_state
                 })
                 print(f"  {duration:6.1f}μs: {last_state} → {current_state}")
-                last_state = current_state
         
         print(f"\n検出された状態変化数: {len(state_changes)}")
         
@@ -113,101 +107,36 @@ def analyze_dht11_timing():
         # 完全なデータ読み取りを試行
         print("完全なDHT11読み取りを実行...")
         
-        # 開始信号
         pi.set_mode(pin, pigpio.OUTPUT)
         pi.write(pin, 1)
         time.sleep(0.1)
-        pi.write(pin, 0)
-        time.sleep(0.018)
-        pi.write(pin, 1)
-        time.sleep(0.000030)
-        pi.set_mode(pin, pigpio.INPUT)
         
-        # データビット読み取り
-        bits = []
-        bit_count = 0
+        bytes_data, status = read_frame(pi, pin)
         
-        # 応答待ち
-        start_time = time.time()
-        while pi.read(pin) == 1 and (time.time() - start_time) < 0.001:
-            pass
-        
-        if pi.read(pin) == 0:
-            print("応答LOW検出")
+        if status == 'NO_RESPONSE':
+            print("応答検出失敗")
+        elif bytes_data is None:
+            print(f"❌ データ読み取り不完全 ({status})")
+        else:
+            print("応答検出")
+            for i, byte_val in enumerate(bytes_data, 1):
+                print(f"バイト{i}: {byte_val:08b} = {byte_val}")
             
-            # 応答LOW待ち
-            while pi.read(pin) == 0 and (time.time() - start_time) < 0.002:
-                pass
+            # チェックサム検証
+            humidity = bytes_data[0]
+            temperature = bytes_data[2]
+            checksum = bytes_data[4]
+            calculated_checksum = calc_checksum(bytes_data)
             
-            if pi.read(pin) == 1:
-                print("応答HIGH検出")
-                
-                # 応答HIGH待ち
-                while pi.read(pin) == 1 and (time.time() - start_time) < 0.003:
-                    pass
-                
-                # データビット読み取り
-                for i in range(40):
-                    # LOW待ち
-                    low_start = time.time()
-                    while pi.read(pin) == 0 and (time.time() - low_start) < 0.0001:
-                        pass
-                    
-                    if pi.read(pin) == 1:
-                        # HIGH期間測定
-                        high_start = time.time()
-                        while pi.read(pin) == 1 and (time.time() - high_start) < 0.0001:
-                            pass
-                        
-                        high_duration = (time.time() - high_start) * 1000000
-                        
-                        if high_duration > 40:  # 40μs以上なら'1'
-                            bits.append('1')
-                        else:
-                            bits.append('0')
-                        
-                        bit_count += 1
-                        
-                        if bit_count % 8 == 0:
-                            byte_str = ''.join(bits[-8:])
-                            byte_val = int(byte_str, 2)
-                            print(f"バイト{bit_count//8}: {byte_str} = {byte_val}")
-                    else:
-                        print(f"ビット{i}でHIGH検出失敗")
-                        break
-                
-                print(f"\n読み取り完了: {bit_count}/40 ビット")
-                
-                if bit_count == 40:
-                    # チェックサム検証
-                    bytes_data = []
-                    for j in range(5):
-                        byte_bits = bits[j*8:(j+1)*8]
-                        byte_val = int(''.join(byte_bits), 2)
-                        bytes_data.append(byte_val)
-                    
-                    humidity = bytes_data[0]
-                    temperature = bytes_data[2]
-                    checksum = bytes_data[4]
-                    calculated_checksum = (bytes_data[0] + bytes_data[1] + bytes_data[2] + bytes_data[3]) & 0xFF
-                    
-                    print(f"湿度: {humidity}%")
-                    print(f"温度: {temperature}°C")
-                    print(f"チェックサム: {checksum} (計算値: {calculated_checksum})")
-                    
-                    if checksum == calculated_checksum:
-                        print("✅ チェックサム: 正常")
-                        print("🎉 DHT11読み取り成功!")
-                    else:
-                        print("❌ チェックサム: エラー")
-                else:
-                    print("❌ データ読み取り不完全")
+            print(f"湿度: {humidity}%")
+            print(f"温度: {temperature}°C")
+            print(f"チェックサム: {checksum} (計算値: {calculated_checksum})")
+            
+            if checksum == calculated_checksum:
+                print("✅ チェックサム: 正常")
+                print("🎉 DHT11読み取り成功!")
             else:
-                print("応答HIGH検出失敗")
-        else:
-            print("応答LOW検出失敗")
-        
-        pi.stop()
+                print("❌ チェックサム: エラー")
         
     except Exception as e:
         print(f"分析エラー: {e}")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+DHT11 診断ツール ランチャー
+各診断スクリプトを1つのプロセスから呼び出します
+
+指定されたツールのモジュールだけを実行時にインポートするため、
+複数のツールを続けて実行してもインタプリタの起動とpigpio等の
+インポートは1回で済みます。
+
+使用例:
+    python3 dht11_tools.py adaptive
+    python3 dht11_tools.py diagnosis timing sensor
+"""
+
+import sys
+from importlib import import_module
+
+# ツール名 → (モジュール名, 関数名)
+TOOLS = {
+    'adaptive': ('dht11_adaptive_read', 'adaptive_dht11_read'),
+    'diagnosis': ('dht11_diagnosis', 'main'),
+    'pigpio': ('dht11_pigpio_test', 'main'),
+    'pullup': ('dht11_pullup_test', 'test_pullup_solutions'),
+    'sensor': ('sensor_individual_diagnosis', 'sensor_diagnosis'),
+    'step': ('dht11_step_by_step_test', 'test_step_by_step'),
+    'timing': ('dht11_timing_analysis', 'analyze_dht11_timing'),
+    'waveform': ('dht11_waveform_test', 'main'),
+}
+
+
+def run_tool(name):
+    """
+    ツールを読み込んで実行
+    
+    Args:
+        name (str): TOOLS のキー
+    """
+    module_name, function_name = TOOLS[name]
+    module = import_module(module_name)
+    getattr(module, function_name)()
+
+
+def main():
+    """メイン関数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='DHT11 診断ツール ランチャー')
+    parser.add_argument('tools', nargs='+', choices=sorted(TOOLS),
+                        help='実行するツール（複数指定した場合は順に実行）')
+    
+    args = parser.parse_args()
+    
+    try:
+        for name in args.tools:
+            run_tool(name)
+    except KeyboardInterrupt:
+        print("\n中断しました")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ DHT11 波形制御版 - pigpioの波形機能を使用
 最高精度でDHT11通信を行います
 """
 
+import threading
+
 try:
     import pigpio
     import time
@@ -11,6 +13,12 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
+from dht11_common import (FRAME_EDGES, FRAME_TIMEOUT, START_HIGH_US, calc_checksum,
+                          decode_frame, get_pi)
+
+# 開始信号のLOW期間（μs）
+START_LOW_US = 18000
+
 class DHT11_Waveform:
     """pigpio波形制御を使用したDHT11クラス"""
     
@@ -24,8 +32,38 @@ class DHT11_Waveform:
         if not self.pi.connected:
             raise RuntimeError("pigpioデーモンに接続できません")
         
+        # 開始信号の波形（18ms LOW + 40μs HIGH）は毎回同じなので最初に1回だけ作成
+        # wave_clear()はデーモン全体の波形を消すため使わない（常駐側の波形を壊さない）
+        mask = 1 << pin
+        self.pi.wave_add_generic([
+            pigpio.pulse(0, mask, START_LOW_US),   # 18ms LOW
+            pigpio.pulse(mask, 0, START_HIGH_US),  # 40μs HIGH
+        ])
+        self._start_wave_id = self.pi.wave_create()
+        if self._start_wave_id < 0:
+            self.pi.stop()
+            raise RuntimeError(f"波形作成失敗: {self._start_wave_id}")
+        
+        # エッジコールバックで記録した (level, tick) の列
+        # （pigpioデーモンがμs単位のtickを付けるため、Python側でポーリングしない）
+        self._edges = []
+        self._frame_ready = threading.Event()
+        # ウォッチドッグ通知（level=2）が記録に混ざらないよう無効化しておく
+        self.pi.set_watchdog(pin, 0)
+        self._cb = self.pi.callback(pin, pigpio.EITHER_EDGE, self._on_edge)
+        
         print(f"pigpio波形制御 接続成功 (GPIO{pin})")
     
+    def _on_edge(self, gpio, level, tick):
+        """エッジコールバック（pigpioのスレッドから呼ばれる）"""
+        edges = self._edges
+        if level > 1 or len(edges) >= FRAME_EDGES:  # 2はウォッチドッグ通知
+            return
+        # 1フレーム分が揃ったら、次の読み取りで消去するまでそれ以上は記録しない
+        edges.append((level, tick))
+        if len(edges) == FRAME_EDGES:
+            self._frame_ready.set()
+    
     def read_waveform(self, debug=False):
         """波形制御による高精度読み取り"""
         try:
@@ -36,25 +74,22 @@ class DHT11_Waveform:
             if not self._send_start_waveform(debug):
                 return None, None, 'START_SIGNAL_FAILED'
             
-            # 応答信号確認
-            if not self._wait_response_precise(debug):
-                return None, None, 'NO_RESPONSE'
-            
-            # データ読み取り
-            bits = self._read_data_precise(debug)
-            if not bits or len(bits) < 40:
-                return None, None, f'READ_ERROR_{len(bits) if bits else 0}_BITS'
-            
-            # データ変換
-            bytes_data = self._bits_to_bytes(bits[:40])
+            # 応答〜データの全エッジが記録されるまで待機
+            self._frame_ready.wait(FRAME_TIMEOUT)
+            if debug:
+                print(f"記録したエッジ数: {len(self._edges)}")
             
-            # チェックサム確認
-            checksum = (bytes_data[0] + bytes_data[1] + bytes_data[2] + bytes_data[3]) & 0xFF
-            if checksum != bytes_data[4]:
+            # 応答確認〜データ変換〜チェックサム確認（共通のデコーダー）
+            bytes_data, status = decode_frame(list(self._edges))
+            if status == 'CHECKSUM_ERROR':
                 if debug:
-                    print(f"チェックサムエラー: 計算={checksum:02x}, 受信={bytes_data[4]:02x}")
+                    print(f"チェックサムエラー: 計算={calc_checksum(bytes_data):02x}, 受信={bytes_data[4]:02x}")
                     print(f"バイトデータ: {[hex(b) for b in bytes_data]}")
-                return None, None, 'CHECKSUM_ERROR'
+                return None, None, status
+            if status != 'OK':
+                if debug:
+                    print(f"読み取り失敗: {status}")
+                return None, None, status
             
             # DHT11データ抽出
             humidity = bytes_data[0]
@@ -73,45 +108,26 @@ class DHT11_Waveform:
     def _send_start_waveform(self, debug=False):
         """波形による開始信号送信"""
         try:
-            # 波形定義
-            # 18ms LOW + 40μs HIGH
-            waveform = []
-            
-            # 18ms LOW (18000μs)
-            waveform.append(pigpio.pulse(0, 1<<self.pin, 18000))
-            
-            # 40μs HIGH
-            waveform.append(pigpio.pulse(1<<self.pin, 0, 40))
-            
-            # 波形をクリア
-            self.pi.wave_clear()
-            
-            # 波形を追加
-            self.pi.wave_add_generic(waveform)
-            
-            # 波形を作成
-            wave_id = self.pi.wave_create()
-            if wave_id < 0:
-                if debug:
-                    print(f"波形作成失敗: {wave_id}")
-                return False
-            
-            # 初期状態設定（HIGH）
+            # 初期状態設定（出力モードでHIGH）
+            self.pi.set_mode(self.pin, pigpio.OUTPUT)
             self.pi.write(self.pin, 1)
             time.sleep(0.1)  # 安定化
             
             if debug:
                 print("波形による開始信号送信中...")
             
-            # 波形送信
-            self.pi.wave_send_once(wave_id)
+            # ここから応答〜データのエッジを記録
+            self._edges.clear()
+            self._frame_ready.clear()
             
-            # 波形送信完了まで待機
-            while self.pi.wave_tx_busy():
-                time.sleep(0.001)
+            # 作成済みの波形を送信
+            self.pi.wave_send_once(self._start_wave_id)
             
-            # 波形削除
-            self.pi.wave_delete(wave_id)
+            # 波形の長さは決まっているので、その分だけ待機
+            # （最後に1回だけ送信完了を確認し、まだ送信中の場合のみ待つ）
+            time.sleep((START_LOW_US + START_HIGH_US) / 1e6)
+            while self.pi.wave_tx_busy():
+                pass
             
             # 入力モードに切り替え
             self.pi.set_mode(self.pin, pigpio.INPUT)
@@ -127,101 +143,13 @@ class DHT11_Waveform:
                 print(f"波形送信エラー: {e}")
             return False
     
-    def _wait_response_precise(self, debug=False):
-        """応答信号待機"""
-        timeout_us = 100000  # 100ms
-        
-        try:
-            # DHT11応答待機
-            start_time = self.pi.get_tick()
-            
-            # HIGH->LOW変化待機
-            while self.pi.read(self.pin) == 1:
-                if (self.pi.get_tick() - start_time) > timeout_us:
-                    if debug:
-                        print("応答1: HIGH->LOW変化タイムアウト")
-                    return False
-            
-            # LOW期間
-            start_time = self.pi.get_tick()
-            while self.pi.read(self.pin) == 0:
-                if (self.pi.get_tick() - start_time) > timeout_us:
-                    if debug:
-                        print("応答2: LOW期間タイムアウト")
-                    return False
-            
-            # HIGH期間
-            start_time = self.pi.get_tick()
-            while self.pi.read(self.pin) == 1:
-                if (self.pi.get_tick() - start_time) > timeout_us:
-                    if debug:
-                        print("応答3: HIGH期間タイムアウト")
-                    return False
-            
-            if debug:
-                print("応答信号: 正常検出")
-            return True
-            
-        except Exception as e:
-            if debug:
-                print(f"応答信号エラー: {e}")
-            return False
-    
-    def _read_data_precise(self, debug=False):
-        """高精度データ読み取り"""
-        bits = []
-        timeout_us = 200  # 200μs
-        
-        try:
-            for i in range(40):
-                # LOW期間待機
-                start_time = self.pi.get_tick()
-                while self.pi.read(self.pin) == 0:
-                    if (self.pi.get_tick() - start_time) > timeout_us:
-                        if debug:
-                            print(f"ビット{i}: LOW期間タイムアウト")
-                        return bits
-                
-                # HIGH期間測定
-                high_start = self.pi.get_tick()
-                while self.pi.read(self.pin) == 1:
-                    if (self.pi.get_tick() - high_start) > timeout_us:
-                        if debug:
-                            print(f"ビット{i}: HIGH期間タイムアウト")
-                        return bits
-                
-                high_duration = self.pi.get_tick() - high_start
-                
-                # ビット判定
-                bit_value = 1 if high_duration > 40 else 0
-                bits.append(bit_value)
-                
-                if debug and (i < 10 or i >= 35):
-                    print(f"ビット{i}: {high_duration}μs -> {bit_value}")
-            
-            if debug:
-                print(f"データ読み取り完了: 40ビット")
-            return bits
-            
-        except Exception as e:
-            if debug:
-                print(f"データ読み取りエラー: {e}")
-            return bits
-    
-    def _bits_to_bytes(self, bits):
-        """ビット→バイト変換"""
-        bytes_data = []
-        for i in range(5):
-            byte_val = 0
-            for j in range(8):
-                byte_val = (byte_val << 1) + bits[i * 8 + j]
-            bytes_data.append(byte_val)
-        return bytes_data
-    
     def cleanup(self):
         """リソース解放"""
+        if hasattr(self, '_cb'):
+            self._cb.cancel()
+        if hasattr(self, '_start_wave_id'):
+            self.pi.wave_delete(self._start_wave_id)
         if hasattr(self, 'pi'):
-            self.pi.wave_clear()
             self.pi.stop()
 
 def test_waveform_precision():
@@ -233,8 +161,8 @@ def test_waveform_precision():
         return
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
+        pi = get_pi()
+        if pi is None:
             print("pigpioデーモン未接続")
             return
         
@@ -253,7 +181,6 @@ def test_waveform_precision():
             ]
             
             # 波形作成
-            pi.wave_clear()
             pi.wave_add_generic(waveform)
             wave_id = pi.wave_create()
             
@@ -275,8 +202,6 @@ def test_waveform_precision():
             else:
                 print(f"  波形作成失敗: {wave_id}")
         
-        pi.stop()
-        
     except Exception as e:
         print(f"波形精度テストエラー: {e}")
 
@@ -318,7 +243,7 @@ def main():
                 print(f"✗ 失敗: {status}")
             
             if i < 4:
-                time.sleep(2.5)
+                time.sleep(2.05)  # DHT11の最小読み取り間隔（2s）+ 余裕
         
         print(f"\n=== 結果 ===")
         print(f"成功率: {success_count}/5 ({success_count*20}%)")
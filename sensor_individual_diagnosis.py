@@ -11,20 +11,32 @@ try:
 except ImportError:
     PIGPIO_AVAILABLE = False
 
-def test_pullup_resistance():
-    """プルアップ抵抗の動作確認"""
+from dht11_common import capture_frame, get_pi
+
+# ポーリングのタイムアウト（ns、整数比較のみで判定する）
+PULLUP_TIMEOUT_NS = 1_000_000     # 1ms
+
+# 開始信号の解放からセンサー応答（HIGH->LOW）までの最大時間（μs）
+RESPONSE_TIMEOUT_US = 1000
+
+def test_pullup_resistance(pi):
+    """
+    プルアップ抵抗の動作確認
+    
+    Args:
+        pi (pigpio.pi): pigpioデーモンへの接続（未接続の場合はNone）
+    """
     print("=== プルアップ抵抗動作確認 ===")
     
     if not PIGPIO_AVAILABLE:
         print("pigpio未インストール")
         return False
     
+    if pi is None:
+        print("pigpioデーモン未接続")
+        return False
+    
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
-            print("pigpioデーモン未接続")
-            return False
-        
         pin = 4
         
         # 1. 出力モードでLOWに設定
@@ -36,14 +48,14 @@ def test_pullup_resistance():
         pi.set_mode(pin, pigpio.INPUT)
         
         # 3. プルアップ抵抗による立ち上がり時間測定
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
+        deadline = start_ns + PULLUP_TIMEOUT_NS
         
         # HIGHになるまでの時間を測定
-        while pi.read(pin) == 0:
-            if (time.time() - start_time) > 0.001:  # 1ms タイムアウト
-                break
+        while pi.read(pin) == 0 and time.monotonic_ns() < deadline:
+            pass
         
-        pullup_time = (time.time() - start_time) * 1000000  # μs
+        pullup_time = (time.monotonic_ns() - start_ns) / 1000  # μs
         final_state = pi.read(pin)
         
         print(f"プルアップ立ち上がり時間: {pullup_time:.1f}μs")
@@ -63,62 +75,60 @@ def test_pullup_resistance():
         else:
             print("✗ プルアップ抵抗: 機能していない")
             return False
-            
-        pi.stop()
         
     except Exception as e:
         print(f"プルアップテストエラー: {e}")
         return False
 
-def test_sensor_communication_basic():
-    """センサー基本通信テスト"""
+def test_sensor_communication_basic(pi):
+    """
+    センサー基本通信テスト
+    
+    Args:
+        pi (pigpio.pi): pigpioデーモンへの接続（未接続の場合はNone）
+    """
     print("\n=== センサー基本通信テスト ===")
     
-    if not PIGPIO_AVAILABLE:
+    if pi is None:
         return False
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
-            return False
-        
         pin = 4
         
-        # 開始信号送信
+        # 開始信号送信（20ms LOW → 40μs HIGH をDMAの波形出力で送信し、
+        # 応答〜データのエッジはpigpioデーモンのtick付きで記録）
         print("1. 開始信号送信...")
-        pi.set_mode(pin, pigpio.OUTPUT)
-        pi.write(pin, 0)
-        time.sleep(0.020)  # 20ms LOW
-        pi.write(pin, 1)
-        time.sleep(0.00005)  # 50μs HIGH
-        
-        # 入力モードに切り替え
-        pi.set_mode(pin, pigpio.INPUT)
+        edges = capture_frame(pi, pin, start_low_us=20000)
         
         # 応答確認
         print("2. センサー応答確認...")
         
-        # 初期状態
-        initial_state = pi.read(pin)
-        print(f"   初期状態: {'HIGH' if initial_state else 'LOW'}")
+        # 開始信号の解放（最初の立ち上がり）
+        release = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
         
-        # HIGH->LOW変化待機 (1ms タイムアウト)
-        start_time = time.time()
-        response_detected = False
+        # 初期状態（解放後に最初に記録されたエッジのレベル、エッジが無ければ解放後のHIGHのまま、
+        # 解放自体が記録されていなければLOWのまま）
+        if release is None:
+            initial_state = 0
+        elif release + 1 < len(edges):
+            initial_state = edges[release + 1][0]
+        else:
+            initial_state = 1
+        print(f"   初期状態: {'HIGH' if initial_state else 'LOW'}")
         
-        while (time.time() - start_time) < 0.001:
-            if pi.read(pin) == 0:
-                response_detected = True
-                break
+        # HIGH->LOW変化 (解放から1ms以内)
+        fall = None
+        if release is not None:
+            fall = next((i for i in range(release + 1, len(edges)) if edges[i][0] == 0), None)
+        response_detected = (fall is not None and
+                             pigpio.tickDiff(edges[release][1], edges[fall][1]) <= RESPONSE_TIMEOUT_US)
         
         if response_detected:
             print("   ✓ センサー応答検出")
             
-            # 応答パターンの詳細確認
-            time.sleep(0.0001)  # 100μs待機
-            mid_state = pi.read(pin)
-            time.sleep(0.0001)  # さらに100μs待機
-            later_state = pi.read(pin)
+            # 応答パターンの詳細確認（応答検出から100μs後、200μs後の状態）
+            mid_state = _level_after(edges, fall, 100)
+            later_state = _level_after(edges, fall, 200)
             
             print(f"   応答中の状態変化: {initial_state} -> 0 -> {mid_state} -> {later_state}")
             
@@ -131,44 +141,71 @@ def test_sensor_communication_basic():
         else:
             print("   ✗ センサー応答なし")
             return False
-            
-        pi.stop()
         
     except Exception as e:
         print(f"基本通信テストエラー: {e}")
         return False
 
-def test_multiple_pins():
-    """複数ピンでのテスト"""
+def _level_after(edges, index, offset_us):
+    """
+    記録したエッジから、edges[index] の offset_us μs後のピン状態を求める
+    
+    Args:
+        edges (list): (level, tick) のリスト
+        index (int): 基準にするエッジの位置
+        offset_us (int): 基準からの経過時間（μs）
+        
+    Returns:
+        int: その時点のレベル（0/1）
+    """
+    base_tick = edges[index][1]
+    state = edges[index][0]
+    for level, tick in edges[index + 1:]:
+        if pigpio.tickDiff(base_tick, tick) > offset_us:
+            break
+        state = level
+    return state
+
+def test_multiple_pins(pi):
+    """
+    複数ピンでのテスト
+    
+    Args:
+        pi (pigpio.pi): pigpioデーモンへの接続（未接続の場合はNone）
+    """
     print("\n=== 複数ピンテスト ===")
     
     test_pins = [4, 18, 17, 27, 22]
     working_pins = []
     
-    if not PIGPIO_AVAILABLE:
+    if pi is None:
         return []
     
     try:
-        pi = pigpio.pi()
-        if not pi.connected:
-            return []
+        # 基本I/O確認（全ピンをまとめて操作し、状態はバンク0の読み取り1回で取得）
+        mask = sum(1 << pin for pin in test_pins)
         
         for pin in test_pins:
-            print(f"\nGPIO{pin}でテスト:")
-            
-            # 基本I/O確認
             pi.set_mode(pin, pigpio.OUTPUT)
-            pi.write(pin, 1)
-            time.sleep(0.01)
-            state1 = pi.read(pin)
-            
-            pi.write(pin, 0)
-            time.sleep(0.01)
-            state2 = pi.read(pin)
-            
+        pi.set_bank_1(mask)
+        time.sleep(0.01)
+        high_bank = pi.read_bank_1()
+        
+        pi.clear_bank_1(mask)
+        time.sleep(0.01)
+        low_bank = pi.read_bank_1()
+        
+        for pin in test_pins:
             pi.set_mode(pin, pigpio.INPUT)
-            time.sleep(0.01)
-            state3 = pi.read(pin)
+        time.sleep(0.01)
+        input_bank = pi.read_bank_1()
+        
+        for pin in test_pins:
+            print(f"\nGPIO{pin}でテスト:")
+            
+            state1 = (high_bank >> pin) & 1
+            state2 = (low_bank >> pin) & 1
+            state3 = (input_bank >> pin) & 1
             
             print(f"  I/Oテスト: HIGH={state1}, LOW={state2}, INPUT={state3}")
             
@@ -178,7 +215,6 @@ def test_multiple_pins():
             else:
                 print(f"  ✗ GPIO{pin}: 基本動作NG")
         
-        pi.stop()
         return working_pins
         
     except Exception as e:
@@ -190,14 +226,17 @@ def sensor_diagnosis():
     print("DHT11センサー個体診断")
     print("=" * 50)
     
+    # 3つのテストでpigpioデーモンへの接続を共有（接続はプロセス終了時に閉じる）
+    pi = get_pi()
+    
     # 1. プルアップ抵抗確認
-    pullup_ok = test_pullup_resistance()
+    pullup_ok = test_pullup_resistance(pi)
     
     # 2. センサー通信確認
-    sensor_ok = test_sensor_communication_basic()
+    sensor_ok = test_sensor_communication_basic(pi)
     
     # 3. 複数ピン確認
-    working_pins = test_multiple_pins()
+    working_pins = test_multiple_pins(pi)
     
     # 診断結果
     print("\n" + "=" * 50)
@@ -23,6 +23,15 @@ echo "必要なパッケージをインストールしています..."
 sudo apt update
 sudo apt install -y python3 python3-pip python3-full python3-rpi.gpio git
 
+# JSONの高速シリアライズ用（任意、無い場合は標準のjsonモジュールを使用）
+sudo apt install -y python3-orjson || echo "python3-orjson をインストールできませんでした（標準のjsonを使用します）"
+
+# Gitのコミットをプロセス内で行うため（任意、無い場合はgitコマンドを使用）
+sudo apt install -y python3-pygit2 || echo "python3-pygit2 をインストールできませんでした（gitコマンドを使用します）"
+
+# Raspberry Pi 5でGPIOを読み取るため（任意、無い場合はpigpio・RPi.GPIOを使用）
+sudo apt install -y python3-lgpio || echo "python3-lgpio をインストールできませんでした（pigpio・RPi.GPIOを使用します）"
+
 # 仮想環境を作成してライブラリをインストール
 echo "Python仮想環境を作成しています..."
 python3 -m venv ~/temp_humidity_venv
@@ -41,7 +50,7 @@ cp -r ./* "$INSTALL_DIR/"
 
 # 必要なファイルの存在確認
 echo "必要なファイルの存在確認..."
-required_files=("config.ini" "data_collector.py" "dht11_library.py" "temp-humidity-monitor.service")
+required_files=("config.ini" "data_collector.py" "dht11_library.py" "dht11_common.py" "temp-humidity-monitor.service")
 for file in "${required_files[@]}"; do
     if [ ! -f "$INSTALL_DIR/$file" ] && [ ! -f "$INSTALL_DIR/raspberry_pi/$file" ]; then
         echo "エラー: 必要なファイル '$file' が見つかりません"
@@ -49,6 +58,7 @@ for file in "${required_files[@]}"; do
         echo "- config.ini"
         echo "- data_collector.py" 
         echo "- dht11_library.py"
+        echo "- dht11_common.py"
         echo "- temp-humidity-monitor.service"
         exit 1
     fi
@@ -2,10 +2,35 @@
 """
 シンプルなDHT11センサーテスト
 基本的なアルゴリズムでDHT11からデータを読み取ります
+pigpioデーモンまたはlgpio（Raspberry Pi 5対応）が使える場合はエッジのタイムスタンプから、
+どちらも使えない場合はRPi.GPIOのポーリングで読み取ります
 """
 
-import RPi.GPIO as GPIO
 import time
+from array import array
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+try:
+    import lgpio
+except ImportError:
+    lgpio = None
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
+
+from dht11_common import (BIT_DIGITS, BIT_THRESHOLD_US, POLL_BIT_THRESHOLD_NS, calc_checksum,
+                          capture_frame, capture_frame_lgpio, get_pi, high_times,
+                          open_lgpio_chip, realtime_priority)
+
+# RPi.GPIOでのポーリングのタイムアウト（ns、CPU速度に依存しないよう経過時間で判定する）
+RESPONSE_TIMEOUT_NS = 1_000_000   # 開始信号の解放〜応答（1ms）
+PULSE_TIMEOUT_NS = 500_000        # 応答・各ビットのパルス（最長80μs、余裕を見て500μs）
 
 def simple_dht11_test(pin=4):
     """
@@ -17,17 +42,219 @@ def simple_dht11_test(pin=4):
     Returns:
         tuple: (temperature, humidity) または None
     """
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
+    backend = _setup()
+    if backend is None:
+        return None
+    
+    try:
+        return _read_once(backend, pin)
+    finally:
+        _teardown(backend)
+
+def _setup():
+    """
+    読み取りの準備（連続読み取りでは最初に1回だけ呼び出す）
+    
+    pigpioデーモン、lgpio（gpiochip）、RPi.GPIO の順に使えるものを選びます。
+    
+    Returns:
+        tuple: (方式名, pigpio.pi または gpiochipのハンドル)、どれも使えない場合はNone
+    """
+    pi = get_pi()
+    if pi is not None:
+        return 'pigpio', pi
+    
+    handle = open_lgpio_chip()
+    if handle is not None:
+        return 'lgpio', handle
+    
+    if GPIO is not None:
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        return 'gpio', None
+    
+    print("エラー: pigpio・lgpioが使えず、RPi.GPIOもインストールされていません")
+    return None
+
+def _teardown(backend):
+    """
+    読み取りの後片付け（lgpioのgpiochipを閉じ、RPi.GPIOはクリーンアップ）
+    
+    Args:
+        backend (tuple): _setup() の戻り値
+    """
+    method, handle = backend
+    if method == 'lgpio':
+        lgpio.gpiochip_close(handle)
+    elif method == 'gpio':
+        GPIO.cleanup()
+
+def _read_once(backend, pin):
+    """
+    DHT11から1回読み取り（_setup() 済みであること）
     
+    Args:
+        backend (tuple): _setup() の戻り値
+        pin (int): DHT11のデータピン番号（BCM番号）
+        
+    Returns:
+        tuple: (temperature, humidity) または None
+    """
+    method, handle = backend
     try:
         print(f"DHT11センサー読み取り開始 (GPIO{pin})")
         
-        # 初期状態の確認
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        initial_state = GPIO.input(pin)
-        print(f"初期GPIO状態: {initial_state} ({'HIGH' if initial_state else 'LOW'})")
+        if method == 'pigpio':
+            bits = read_bits_pigpio(handle, pin)
+        elif method == 'lgpio':
+            bits = read_bits_lgpio(handle, pin)
+        else:
+            bits = read_bits_gpio(pin)
+        if bits is None:
+            return None
+        
+        print(f"データ読み取り完了: {len(bits)}ビット")
+        
+        if len(bits) < 32:
+            print("読み取りビット数が不足しています")
+            return None
+        
+        # ビットをバイトに変換
+        # （ビットごとのループではなく、bytes の変換と int() の基数変換で一括処理、
+        #   40ビット未満の場合は残りを0で埋める）
+        frame = int(bytes(bits[:40]).translate(BIT_DIGITS), 2) << (40 - len(bits[:40]))
+        bytes_data = frame.to_bytes(5, 'big')
+        
+        print(f"バイトデータ: {bytes_data.hex(' ')}")
+        
+        # 温湿度データを抽出（5バイトをそのまま展開）
+        humidity_int, humidity_dec, temperature_int, temperature_dec, checksum_received = bytes_data
+        
+        # DHT11では小数部は通常0のため、その場合は整数部だけで値を求める
+        if humidity_dec or temperature_dec:
+            humidity = humidity_int + humidity_dec * 0.1
+            temperature = temperature_int + temperature_dec * 0.1
+        else:
+            humidity = float(humidity_int)
+            temperature = float(temperature_int)
+        
+        # チェックサムを計算
+        checksum_calculated = calc_checksum(bytes_data)
+        
+        print(f"湿度: {humidity}% (整数部: {humidity_int}, 小数部: {humidity_dec})")
+        print(f"温度: {temperature}°C (整数部: {temperature_int}, 小数部: {temperature_dec})")
+        print(f"チェックサム: 計算値=0x{checksum_calculated:02x}, 受信値=0x{checksum_received:02x}")
         
+        # チェックサム検証
+        if checksum_calculated == checksum_received:
+            print("✓ チェックサム OK!")
+            
+            # 値の妥当性をチェック
+            if 0 <= humidity <= 100 and -40 <= temperature <= 80:
+                print("✓ 値の範囲 OK!")
+                return temperature, humidity
+            else:
+                print("✗ 値が妥当範囲外です")
+                return None
+        else:
+            print("✗ チェックサムエラー")
+            # チェックサムエラーでも参考値として表示
+            print(f"参考値: 温度={temperature}°C, 湿度={humidity}%")
+            return None
+            
+    except Exception as e:
+        print(f"エラー: {e}")
+        return None
+
+def read_bits_pigpio(pi, pin):
+    """
+    pigpioでエッジを記録して40ビットのデータを読み取り
+    
+    開始信号〜データのエッジにはpigpioデーモンがμs単位のtickを付けるため、
+    Python側ではピンをポーリングせず、記録後にHIGH期間を求めます。
+    
+    Returns:
+        bytearray: ビット（0/1）の列（部分読み取りを含む）、応答が無い場合はNone
+    """
+    # 20ms LOW の開始信号を送信し、内蔵プルアップ有効で応答〜データを記録
+    edges = capture_frame(pi, pin, start_low_us=20000, pull=pigpio.PUD_UP)
+    
+    # 開始信号の立ち上がり（LOWの終わり）の次から応答（HIGH→LOW→HIGH→LOW）が始まる
+    release = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
+    if release is None or len(edges) < release + 4:
+        print(f"エラー: DHT11からの応答がありません (エッジ数: {len(edges)})")
+        return None
+    
+    print(f"応答信号検出: エッジ数={len(edges)}")
+    print("データ読み取り開始...")
+    
+    # 応答の最後のHIGH→LOWからデータが始まる
+    return _frame_to_bits(edges[release + 3:release + 84])
+
+def read_bits_lgpio(handle, pin):
+    """
+    lgpioでエッジを記録して40ビットのデータを読み取り
+    
+    入力への切り替え後のエッジにはカーネルがタイムスタンプを付けるため、
+    pigpioデーモンが無くてもポーリングせずに読み取れます。
+    
+    Returns:
+        bytearray: ビット（0/1）の列（部分読み取りを含む）、応答が無い場合はNone
+    """
+    # 20ms LOW の開始信号を送信し、内蔵プルアップ有効で応答〜データを記録
+    edges = capture_frame_lgpio(handle, pin, start_low_us=20000)
+    
+    # 開始信号のエッジは記録されないため、応答の立ち上がり（LOW→HIGH）を基準にする
+    response = next((i for i, (level, _) in enumerate(edges) if level == 1), None)
+    if response is None or len(edges) < response + 2:
+        print(f"エラー: DHT11からの応答がありません (エッジ数: {len(edges)})")
+        return None
+    
+    print(f"応答信号検出: エッジ数={len(edges)}")
+    print("データ読み取り開始...")
+    
+    # 応答のHIGH→LOWからデータが始まる
+    return _frame_to_bits(edges[response + 1:response + 82])
+
+def _frame_to_bits(frame):
+    """
+    データ部のエッジからビット列を復元
+    
+    Args:
+        frame (list): データ開始の立ち下がりから始まる (level, tick) のリスト
+                      （各ビットは LOW → HIGH → 次のLOW の順に並ぶ）
+        
+    Returns:
+        bytearray: ビット（0/1）の列（部分読み取りを含む）
+    """
+    durations = high_times(frame)
+    
+    # ビット判定: 26-28μs=0, 70μs=1（ビットごとに分岐せず、比較結果をそのままビットにする）
+    bits = bytearray(duration > BIT_THRESHOLD_US for duration in durations)
+    
+    # 最初の10ビットをデバッグ表示
+    for i, duration in enumerate(durations[:10]):
+        print(f"ビット{i:2d}: {duration:5d}μs -> {bits[i]}")
+    
+    if len(bits) < 40:
+        print(f"部分読み取り: {len(bits)}ビット")
+    
+    return bits
+
+def read_bits_gpio(pin):
+    """
+    RPi.GPIOのポーリングで40ビットのデータを読み取り
+    
+    Returns:
+        bytearray: ビット（0/1）の列（部分読み取りを含む）、エラー時はNone
+    """
+    # 初期状態の確認
+    GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+    initial_state = GPIO.input(pin)
+    print(f"初期GPIO状態: {initial_state} ({'HIGH' if initial_state else 'LOW'})")
+    
+    # ポーリングで時間を測るため、開始信号〜データ受信はリアルタイム優先度で実行
+    with realtime_priority(priority=80):
         # 開始信号を送信
         GPIO.setup(pin, GPIO.OUT)
         GPIO.output(pin, GPIO.HIGH)  # まず確実にHIGHにする
@@ -42,126 +269,73 @@ def simple_dht11_test(pin=4):
         after_setup_state = GPIO.input(pin)
         print(f"開始信号後GPIO状態: {after_setup_state} ({'HIGH' if after_setup_state else 'LOW'})")
         
+        # ポーリングループ内の属性参照を避けるためローカルに束縛
+        now_ns = time.monotonic_ns
+        
         # DHT11の応答信号を待機
-        timeout = 0
+        start_ns = now_ns()
+        deadline_ns = start_ns + RESPONSE_TIMEOUT_NS
         while GPIO.input(pin) == GPIO.HIGH:
-            timeout += 1
-            if timeout > 10000:  # タイムアウトを増加
-                print(f"エラー: DHT11からの応答がありません (タイムアウト: {timeout})")
+            if now_ns() > deadline_ns:
+                print("エラー: DHT11からの応答がありません (タイムアウト)")
                 return None
         
-        print(f"応答信号検出 (HIGH->LOW): タイムアウトカウント={timeout}")
+        print(f"応答信号検出 (HIGH->LOW): {(now_ns() - start_ns) / 1000:.1f}μs")
         
         # 応答信号の LOW 部分を待機
-        timeout = 0
+        start_ns = now_ns()
+        deadline_ns = start_ns + PULSE_TIMEOUT_NS
         while GPIO.input(pin) == GPIO.LOW:
-            timeout += 1
-            if timeout > 10000:
-                print(f"エラー: 応答信号LOWが長すぎます (タイムアウト: {timeout})")
+            if now_ns() > deadline_ns:
+                print("エラー: 応答信号LOWが長すぎます (タイムアウト)")
                 return None
         
-        print(f"応答信号LOW完了: タイムアウトカウント={timeout}")
+        print(f"応答信号LOW完了: {(now_ns() - start_ns) / 1000:.1f}μs")
         
         # 応答信号の HIGH 部分を待機
-        timeout = 0
+        start_ns = now_ns()
+        deadline_ns = start_ns + PULSE_TIMEOUT_NS
         while GPIO.input(pin) == GPIO.HIGH:
-            timeout += 1
-            if timeout > 10000:
-                print(f"エラー: 応答信号HIGHが長すぎます (タイムアウト: {timeout})")
+            if now_ns() > deadline_ns:
+                print("エラー: 応答信号HIGHが長すぎます (タイムアウト)")
                 return None
         
-        print(f"応答信号HIGH完了: タイムアウトカウント={timeout}")
+        print(f"応答信号HIGH完了: {(now_ns() - start_ns) / 1000:.1f}μs")
         print("データ読み取り開始...")
         
-        # 40ビットのデータを読み取り
-        bits = []
+        # 40ビットのデータを読み取り（HIGH期間のみ記録し、判定と表示は読み取り後に行う）
+        # ループ内で伸長しないよう、40ビット分をあらかじめ確保してインデックスで代入
+        high_times_ns = array('q', bytes(8 * 40))
         for i in range(40):
             # 各ビットの LOW 部分を待機
-            timeout = 0
+            deadline_ns = now_ns() + PULSE_TIMEOUT_NS
             while GPIO.input(pin) == GPIO.LOW:
-                timeout += 1
-                if timeout > 10000:
+                if now_ns() > deadline_ns:
                     print(f"ビット{i}: LOW待機タイムアウト")
                     return None
             
-            # HIGH 部分の時間を測定
-            start_time = time.time()
-            timeout = 0
+            # HIGH 部分の時間を測定（整数nsで計測）
+            high_start_ns = now_ns()
+            deadline_ns = high_start_ns + PULSE_TIMEOUT_NS
             while GPIO.input(pin) == GPIO.HIGH:
-                timeout += 1
-                if timeout > 10000:
-                    print(f"ビット{i}: HIGH待機タイムアウト (カウント={timeout})")
+                if now_ns() > deadline_ns:
+                    print(f"ビット{i}: HIGH待機タイムアウト")
                     if i >= 10:  # 10ビット以上読めていれば部分成功
                         print(f"部分読み取り成功: {i}ビット")
                         break
                     return None
             
-            duration = (time.time() - start_time) * 1000000  # マイクロ秒
-            
-            # ビット判定: 35μs以上なら1、未満なら0
-            bit_value = 1 if duration > 35 else 0
-            bits.append(bit_value)
-            
-            # 最初の10ビットをデバッグ表示
-            if i < 10:
-                print(f"ビット{i:2d}: {duration:5.1f}μs (カウント:{timeout:4d}) -> {bit_value}")
-        
-        print(f"データ読み取り完了: {len(bits)}ビット")
-        
-        if len(bits) < 32:
-            print("読み取りビット数が不足しています")
-            return None
-        
-        # ビットをバイトに変換
-        bytes_data = []
-        for i in range(5):
-            byte_val = 0
-            for j in range(8):
-                byte_val = (byte_val << 1) + bits[i * 8 + j]
-            bytes_data.append(byte_val)
-        
-        print(f"バイトデータ: {[f'0x{b:02x}' for b in bytes_data]}")
-        
-        # 温湿度データを抽出
-        humidity_int = bytes_data[0]
-        humidity_dec = bytes_data[1]
-        temperature_int = bytes_data[2]
-        temperature_dec = bytes_data[3]
-        checksum_received = bytes_data[4]
-        
-        # DHT11では小数部は通常0
-        humidity = humidity_int + humidity_dec * 0.1
-        temperature = temperature_int + temperature_dec * 0.1
-        
-        # チェックサムを計算
-        checksum_calculated = (humidity_int + humidity_dec + temperature_int + temperature_dec) & 0xFF
-        
-        print(f"湿度: {humidity}% (整数部: {humidity_int}, 小数部: {humidity_dec})")
-        print(f"温度: {temperature}°C (整数部: {temperature_int}, 小数部: {temperature_dec})")
-        print(f"チェックサム: 計算値=0x{checksum_calculated:02x}, 受信値=0x{checksum_received:02x}")
-        
-        # チェックサム検証
-        if checksum_calculated == checksum_received:
-            print("✓ チェックサム OK!")
-            
-            # 値の妥当性をチェック
-            if 0 <= humidity <= 100 and -40 <= temperature <= 80:
-                print("✓ 値の範囲 OK!")
-                return temperature, humidity
-            else:
-                print("✗ 値が妥当範囲外です")
-                return None
-        else:
-            print("✗ チェックサムエラー")
-            # チェックサムエラーでも参考値として表示
-            print(f"参考値: 温度={temperature}°C, 湿度={humidity}%")
-            return None
-            
-    except Exception as e:
-        print(f"エラー: {e}")
-        return None
-    finally:
-        GPIO.cleanup()
+            high_times_ns[i] = now_ns() - high_start_ns
+    
+    # ビット判定: 35μs以上なら1、未満なら0（比較結果をそのままビットにする）
+    bits = bytearray(high_ns > POLL_BIT_THRESHOLD_NS for high_ns in high_times_ns)
+    
+    # 最初の10ビットをデバッグ表示
+    for i, high_ns in enumerate(high_times_ns[:10]):
+        print(f"ビット{i:2d}: {high_ns / 1000:5.1f}μs -> {bits[i]}")
+    
+    return bits
+
 
 def multiple_test(pin=4, count=5):
     """
@@ -172,30 +346,44 @@ def multiple_test(pin=4, count=5):
         count (int): テスト回数
     """
     print(f"=== DHT11 連続テスト ({count}回) ===")
-    successful_readings = []
     
-    for i in range(count):
-        print(f"\n--- テスト {i+1}/{count} ---")
-        result = simple_dht11_test(pin)
-        
-        if result:
-            temp, hum = result
-            successful_readings.append((temp, hum))
-            print(f"成功: 温度={temp}°C, 湿度={hum}%")
-        else:
-            print("失敗")
-        
-        if i < count - 1:
-            print("2秒待機...")
-            time.sleep(2)
+    # 成功した読み取り値（温度・湿度を別々の配列に、あらかじめ回数分確保して先頭から詰める）
+    temperatures = array('d', bytes(8 * count))
+    humidities = array('d', bytes(8 * count))
+    success_count = 0
+    
+    # 準備と後片付けはテスト全体で1回だけ行う（読み取りごとのGPIO.cleanup()を避ける）
+    backend = _setup()
+    if backend is None:
+        return
+    
+    try:
+        for i in range(count):
+            print(f"\n--- テスト {i+1}/{count} ---")
+            result = _read_once(backend, pin)
+            
+            if result:
+                temp, hum = result
+                temperatures[success_count] = temp
+                humidities[success_count] = hum
+                success_count += 1
+                print(f"成功: 温度={temp}°C, 湿度={hum}%")
+            else:
+                print("失敗")
+            
+            if i < count - 1:
+                print("2秒待機...")
+                time.sleep(2)
+    finally:
+        _teardown(backend)
     
     # 結果のまとめ
     print(f"\n=== テスト結果まとめ ===")
-    print(f"成功回数: {len(successful_readings)}/{count}")
+    print(f"成功回数: {success_count}/{count}")
     
-    if successful_readings:
-        avg_temp = sum(reading[0] for reading in successful_readings) / len(successful_readings)
-        avg_hum = sum(reading[1] for reading in successful_readings) / len(successful_readings)
+    if success_count:
+        avg_temp = sum(temperatures[:success_count]) / success_count
+        avg_hum = sum(humidities[:success_count]) / success_count
         print(f"平均値: 温度={avg_temp:.1f}°C, 湿度={avg_hum:.1f}%")
 
 if __name__ == "__main__":
@@ -222,5 +410,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\nエラー: {e}")
     finally:
-        GPIO.cleanup()
-        print("GPIO設定をクリーンアップしました")
+        if GPIO is not None:
+            GPIO.cleanup()
+            print("GPIO設定をクリーンアップしました")